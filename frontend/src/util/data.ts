@@ -74,10 +74,14 @@ export enum ResultType {
   POPULARITY_MALE             =  2,
   POPULARITY_FEMALE           =  3,
   GENDER_POPULARITY_RATIO     =  4,
+  POPULARITY_LOWER_BOUND      =  5,
+  POPULARITY_UPPER_BOUND      =  6,
   SCORE                       = 11,
   SCORE_MALE                  = 12,
   SCORE_FEMALE                = 13,
   GENDER_SCORE_DIFFERENCE     = 14,
+  SCORE_LOWER_BOUND           = 15,
+  SCORE_UPPER_BOUND           = 16,
   UNDERWATCHED                = 21,
   SURPRISE                    = 22,
   DISAPPOINTMENT              = 23,
@@ -62,10 +62,14 @@ const resultTypeDataMap: Record<ResultType, { name: string, formatter: (value?:
   [ResultType.POPULARITY_MALE]: { name: 'Pop\u00ADu\u00ADlar\u00ADi\u00ADty (Male)', formatter: percentageFormatter },
   [ResultType.POPULARITY_FEMALE]: { name: 'Pop\u00ADu\u00ADlar\u00ADi\u00ADty (Fe\u00ADmale)', formatter: percentageFormatter },
   [ResultType.GENDER_POPULARITY_RATIO]: { name: 'Gen\u00ADder Ra\u00ADtio', formatter: genderRatioFormatter },
+  [ResultType.POPULARITY_LOWER_BOUND]: { name: 'Pop\u00ADu\u00ADlar\u00ADi\u00ADty (Low\u00ADer Bound)', formatter: percentageFormatter },
+  [ResultType.POPULARITY_UPPER_BOUND]: { name: 'Pop\u00ADu\u00ADlar\u00ADi\u00ADty (Up\u00ADper Bound)', formatter: percentageFormatter },
   [ResultType.SCORE]: { name: 'Sco\u00ADre', formatter: numberFormatter },
   [ResultType.SCORE_MALE]: { name: 'Sco\u00ADre (Male)', formatter: numberFormatter },
   [ResultType.SCORE_FEMALE]: { name: 'Sco\u00ADre (Fe\u00ADmale)', formatter: numberFormatter },
   [ResultType.GENDER_SCORE_DIFFERENCE]: { name: 'Score Diff.', formatter: scoreDiffFormatter },
+  [ResultType.SCORE_LOWER_BOUND]: { name: 'Sco\u00ADre (Low\u00ADer Bound)', formatter: numberFormatter },
+  [ResultType.SCORE_UPPER_BOUND]: { name: 'Sco\u00ADre (Up\u00ADper Bound)', formatter: numberFormatter },
   [ResultType.AGE]: { name: 'A\u00ADve\u00ADrage Age', formatter: numberFormatter },
   [ResultType.UNDERWATCHED]: { name: 'Un\u00ADder\u00ADwatch\u00ADed', formatter: percentageFormatter },
   [ResultType.SURPRISE]: { name: 'Sur\u00ADprise', formatter: percentageFormatter },
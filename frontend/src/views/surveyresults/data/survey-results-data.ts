@@ -1,4 +1,4 @@
-import type { AnimeViewModel, Gender, ResultType, SurveyViewModel } from "@/util/data";
+import type { AnimeNameType, AnimeType, AnimeViewModel, Gender, ResultType, SurveyViewModel } from "@/util/data";
 
 export interface SurveyResultsData {
   results: Record<number, Record<ResultType, number>>;
@@ -9,4 +9,43 @@ export interface SurveyResultsData {
     ageDistribution: Record<number, number>;
     genderDistribution: Record<Gender, number>;
   };
-}
\ No newline at end of file
+}
+
+/**
+ * Compact version of {@link SurveyResultsData}, requested with `?format=columnar`. Every result type and anime field is an array aligned to `animeIds`.
+ */
+export interface SurveyResultsColumnarData extends Omit<SurveyResultsData, 'results' | 'anime'> {
+  animeIds: number[];
+  results: Record<ResultType, number[]>;
+  anime: {
+    animeTypes: AnimeType[];
+    names: [name: string, isOfficial: boolean, type: AnimeNameType][][];
+    images: [name: string, urlSmall: string, urlMedium: string, urlLarge: string][][];
+  };
+}
+
+export function fromColumnarData(data: SurveyResultsColumnarData): SurveyResultsData {
+  const results: Record<number, Record<ResultType, number>> = {};
+  const anime: Record<number, AnimeViewModel> = {};
+  const resultTypes = Object.keys(data.results).map(resultType => Number(resultType) as ResultType);
+
+  data.animeIds.forEach((animeId, idx) => {
+    const animeResults = {} as Record<ResultType, number>;
+    resultTypes.forEach(resultType => animeResults[resultType] = data.results[resultType][idx]);
+    results[animeId] = animeResults;
+
+    anime[animeId] = {
+      id: animeId,
+      names: data.anime.names[idx].map(([name, isOfficial, type]) => ({ name, isOfficial, type })),
+      images: data.anime.images[idx].map(([name, urlSmall, urlMedium, urlLarge]) => ({ name, urlSmall, urlMedium, urlLarge })),
+      animeType: data.anime.animeTypes[idx],
+    };
+  });
+
+  return {
+    results,
+    anime,
+    survey: data.survey,
+    miscellaneous: data.miscellaneous,
+  };
+}
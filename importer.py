@@ -1,4 +1,5 @@
 from survey.models import Anime, AnimeName, Survey, Response, AnimeResponse, SurveyAdditionRemoval
+from survey.util.results import clear_cached_anime_data
 from django.db.models import Q
 from datetime import datetime
 import re
@@ -111,6 +112,9 @@ def import_anime(file_path):
         AnimeName.objects.bulk_create(animename_list[:900])
         animename_list = animename_list[900:]
 
+    # bulk_create doesn't send the signals that clear the cached data of the anime
+    clear_cached_anime_data()
+
 
 
 
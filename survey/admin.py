@@ -1,5 +1,4 @@
 from django.contrib import admin, messages
-from django.core.cache import BaseCache, caches
 from django.core.files.base import ContentFile
 from django.db.models import Q, Count
 from django.db.models.functions import Concat
@@ -10,6 +9,8 @@ from io import BytesIO
 from PIL import Image as PILImage
 from survey.models import Anime, AnimeName, Video, Image, Survey, Response, AnimeResponse, SurveyAdditionRemoval, MissingAnime
 from survey.util.anime import anime_is_series, anime_series_filter, annotate_year_season, combine_year_season, increment_year_season, is_ongoing_filter_func, special_anime_filter
+from survey.util.counters import rebuild_counters
+from survey.util.results import ResultsGenerator
 import uuid
 
 
@@ -277,8 +278,6 @@ class AnimeAdmin(admin.ModelAdmin):
             
         super().save_model(request, anime, form, change)
 
-        results_cache: BaseCache = caches['long']
-        
         survey_queryset = Survey.objects.filter(opening_time__lt=timezone.now())
         for survey in survey_queryset:
             survey_year_season = combine_year_season(survey.year, survey.season)
@@ -292,7 +291,7 @@ class AnimeAdmin(admin.ModelAdmin):
             if is_removed or is_added:
                 survey_response_count = survey.response_set.count()
                 if survey_response_count > 0:
-                    results_cache.delete('survey_results_%i' % survey.id, version=8)
+                    ResultsGenerator(survey).clear_anime_results_data()
 
                     SurveyAdditionRemoval(
                         survey=survey,
@@ -329,6 +328,28 @@ class ResponseAdmin(admin.ModelAdmin):
     def get_anime_response_count(self, response):
         return response.animeresponse_set.count()
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # The response and its anime responses (saved as inlines) are part of the survey's results
+        self.__refresh_survey_results(form.instance.survey)
+
+    def delete_model(self, request, response: Response):
+        super().delete_model(request, response)
+        self.__refresh_survey_results(response.survey)
+
+    def delete_queryset(self, request, queryset):
+        survey_list = list(Survey.objects.filter(response__in=queryset).distinct())
+        super().delete_queryset(request, queryset)
+        for survey in survey_list:
+            self.__refresh_survey_results(survey)
+
+    def __refresh_survey_results(self, survey: Survey):
+        # Results of finished surveys are generated from the responses again, the live counters of other surveys are rebuilt
+        if survey.state == Survey.State.FINISHED:
+            ResultsGenerator(survey).clear_anime_results_data()
+        else:
+            rebuild_counters(survey)
+
 class SurveyAdmin(admin.ModelAdmin):
     fields = [
         'is_preseason',
@@ -342,6 +363,13 @@ class SurveyAdmin(admin.ModelAdmin):
     ]
     inlines = [SurveyAdditionRemovalInline]
 
+    def save_model(self, request, survey: Survey, form, change):
+        super().save_model(request, survey, form, change)
+
+        # The results of a survey that was reopened can still change, so they shouldn't be kept
+        if change and survey.state != Survey.State.FINISHED:
+            ResultsGenerator(survey).clear_anime_results_data()
+
 
 class MissingAnimeAdmin(admin.ModelAdmin):
     list_display = ('name', 'survey', 'admin_has_reviewed')
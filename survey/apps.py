@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class SurveyConfig(AppConfig):
     name = 'survey'
+
+    def ready(self):
+        # Connects the signal receivers that clear cached data
+        from survey import signals
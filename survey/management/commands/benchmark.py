@@ -0,0 +1,129 @@
+from datetime import datetime
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+import json
+import statistics
+import subprocess
+from survey.models import Response, Survey
+from survey.util.results import ResultsGenerator
+from survey.util.survey import get_survey_anime
+from survey.views.api.index import IndexApi
+from survey.views.api.survey_form import SurveyFormApi
+from survey.views.api.survey_results import SurveyResultsApi
+import sys
+import time
+from typing import Any, Callable, Optional
+
+class Command(BaseCommand):
+    help = 'Times the results generation and the most used API views on the surveys generated by generatesyntheticdata, and outputs a JSON report.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--year', type=int, default=2001, help='Year of the surveys to benchmark.')
+        parser.add_argument('--season', type=int, default=0, help='Season of the surveys to benchmark.')
+        parser.add_argument('--runs', type=int, default=5, help='Amount of times each benchmark is run.')
+        parser.add_argument('--output', type=str, default=None, help='File to write the report to, instead of stdout.')
+
+    def handle(self, *args, **options) -> Optional[str]:
+        try:
+            preseason_survey: Survey = Survey.objects.get(year=options['year'], season=options['season'], is_preseason=True)
+            postseason_survey: Survey = Survey.objects.get(year=options['year'], season=options['season'], is_preseason=False)
+        except Survey.DoesNotExist:
+            raise CommandError('Surveys not found, generate them using generatesyntheticdata first')
+
+        if preseason_survey.state != Survey.State.FINISHED or postseason_survey.state != Survey.State.ONGOING:
+            raise CommandError('The pre-season survey has to be finished and the post-season survey has to be ongoing')
+
+        user, _ = User.objects.get_or_create(username='benchmark', defaults={'is_staff': True})
+        request_factory = RequestFactory()
+
+        def call_view(view_class, method: str, data: Optional[str] = None, **kwargs) -> Callable[[], Any]:
+            def call():
+                request = getattr(request_factory, method)('/', data=data, content_type='application/json') if data else getattr(request_factory, method)('/')
+                request.user = user
+                response = view_class.as_view()(request, **kwargs)
+                if response.status_code >= 400:
+                    raise CommandError('%s %s returned status code %i: %s' % (view_class.__name__, method.upper(), response.status_code, response.content))
+                return response
+            return call
+
+        survey_kwargs = lambda survey: {'year': survey.year, 'season': survey.season, 'pre_or_post': 'pre' if survey.is_preseason else 'post'}
+        postseason_anime_ids = list(get_survey_anime(postseason_survey)[0].values_list('id', flat=True))
+        form_data = json.dumps({
+            'response_data': {'age': 25, 'gender': Response.Gender.FEMALE},
+            'anime_response_data_dict': {
+                str(anime_id): {'score': 4, 'watching': True, 'underwatched': False, 'expectations': None}
+                for anime_id in postseason_anime_ids[::3]
+            },
+            'is_response_linked_to_user': True,
+        })
+
+        def clear_results_cache():
+            ResultsGenerator(preseason_survey).clear_anime_results_data()
+
+        benchmarks: list[tuple[str, Callable[[], Any], Optional[Callable[[], Any]]]] = [
+            ('results_generate_finished', ResultsGenerator(preseason_survey).generate_anime_results_data, None),
+            ('results_generate_ongoing', ResultsGenerator(postseason_survey).generate_anime_results_data, None),
+            ('results_uncached_finished', ResultsGenerator(preseason_survey).get_anime_results_data, clear_results_cache),
+            ('results_cached_finished', ResultsGenerator(preseason_survey).get_anime_results_data, None),
+            ('results_live_ongoing', ResultsGenerator(postseason_survey).get_anime_results_data, None),
+            ('api_survey_results_finished', call_view(SurveyResultsApi, 'get', **survey_kwargs(preseason_survey)), None),
+            ('api_survey_results_ongoing', call_view(SurveyResultsApi, 'get', **survey_kwargs(postseason_survey)), None),
+            ('api_index', call_view(IndexApi, 'get'), None),
+            ('api_survey_form_put', call_view(SurveyFormApi, 'put', data=form_data, **survey_kwargs(postseason_survey)), None),
+            ('api_survey_form_get', call_view(SurveyFormApi, 'get', **survey_kwargs(postseason_survey)), None),
+        ]
+
+        report = {
+            'commit': self.__get_git_commit(),
+            'timestamp': datetime.now().isoformat(),
+            'database': settings.DATABASES['default']['ENGINE'],
+            'results_backend': settings.RESULTS_BACKEND,
+            'dataset': {
+                'anime': len(postseason_anime_ids),
+                'responses': Response.objects.filter(survey__in=[preseason_survey, postseason_survey]).count(),
+            },
+            'benchmarks': {},
+        }
+
+        for name, func, setup in benchmarks:
+            report['benchmarks'][name] = self.__run_benchmark(func, setup, options['runs'])
+            print('%s: %.1f ms' % (name, report['benchmarks'][name]['median_ms']), file=sys.stderr)
+
+        report_json = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(report_json)
+        else:
+            print(report_json)
+
+    def __run_benchmark(self, func: Callable[[], Any], setup: Optional[Callable[[], Any]], runs: int) -> dict[str, Any]:
+        durations_ms = []
+        query_counts = []
+        for _ in range(runs):
+            if setup:
+                setup()
+
+            with CaptureQueriesContext(connection) as captured_queries:
+                start_time = time.perf_counter()
+                func()
+                durations_ms.append((time.perf_counter() - start_time) * 1000)
+            query_counts.append(len(captured_queries))
+
+        return {
+            'runs': runs,
+            'min_ms': min(durations_ms),
+            'median_ms': statistics.median(durations_ms),
+            'mean_ms': statistics.mean(durations_ms),
+            'max_ms': max(durations_ms),
+            'queries': max(query_counts),
+        }
+
+    def __get_git_commit(self) -> Optional[str]:
+        try:
+            return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand, CommandParser
+import math
+from survey.models import Anime, Survey
+from survey.util.results import ResultsGenerator
+import sys
+from typing import Optional
+
+class Command(BaseCommand):
+    help = 'Checks whether the database and NumPy results backends generate the same results for a survey.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('year', type=int)
+        parser.add_argument('season', choices=['winter', 'spring', 'summer', 'fall'])
+        parser.add_argument('pre_or_post', choices=['pre', 'post'])
+
+    def handle(self, *args, **options) -> Optional[str]:
+        year: int = options['year']
+        season = self.__parse_season(options['season'])
+        is_preseason: bool = options['pre_or_post'] == 'pre'
+
+        try:
+            survey: Survey = Survey.objects.get(year=year, season=season, is_preseason=is_preseason)
+        except Survey.DoesNotExist:
+            print('That survey does not exist', file=sys.stderr)
+            return
+
+        database_results = ResultsGenerator(survey, backend='database').generate_anime_results_data()
+        numpy_results = ResultsGenerator(survey, backend='numpy').generate_anime_results_data()
+
+        mismatch_count = 0
+        for anime_id, anime_results in database_results.items():
+            for result_type, database_value in anime_results.items():
+                numpy_value = numpy_results.get(anime_id, {}).get(result_type)
+                if not self.__values_match(database_value, numpy_value):
+                    mismatch_count += 1
+                    print('Anime %i, %s: database %s, numpy %s' % (anime_id, result_type.name, database_value, numpy_value), file=sys.stderr)
+
+        print('Compared %i anime, found %i mismatches' % (len(database_results), mismatch_count))
+
+    def __values_match(self, a: Optional[float], b: Optional[float]) -> bool:
+        if a is None or b is None:
+            return a is None and b is None
+        return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-12)
+
+    def __parse_season(self, season_str: str) -> Anime.AnimeSeason:
+        if season_str == 'winter':
+            return Anime.AnimeSeason.WINTER
+        elif season_str == 'spring':
+            return Anime.AnimeSeason.SPRING
+        elif season_str == 'summer':
+            return Anime.AnimeSeason.SUMMER
+        else:
+            return Anime.AnimeSeason.FALL
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from survey.models import Survey
+from survey.views.api.index import export_index_snapshot
+from survey.views.api.survey_results import export_results_snapshots
+from typing import Optional
+
+class Command(BaseCommand):
+    help = 'Exports the results of all finished surveys, and the index if all surveys are finished, to static snapshots in STATIC_ROOT.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing', action='store_true', help='Only export the results of finished surveys that have no snapshots yet, e.g. when run periodically.')
+
+    def handle(self, *args, **options) -> Optional[str]:
+        for survey in Survey.objects.all():
+            if survey.state == Survey.State.FINISHED:
+                if export_results_snapshots(survey, overwrite=not options['missing']):
+                    print('Exported the results of "%s"' % str(survey))
+
+        if export_index_snapshot():
+            print('Exported the index')
+        else:
+            print('Did not export the index, not all surveys are finished')
@@ -0,0 +1,139 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError, CommandParser
+from django.db import transaction
+from django.utils import timezone
+import random
+from survey.models import Anime, AnimeName, AnimeResponse, Image, Response, Survey
+from survey.util.counters import rebuild_counters
+from survey.util.results import clear_cached_anime_data
+from typing import Optional
+
+class Command(BaseCommand):
+    help = 'Generates a synthetic pre-season and post-season survey with anime and responses, to be used for benchmarking. Never run this on a production database.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('--year', type=int, default=2001, help='Year of the generated surveys and anime.')
+        parser.add_argument('--season', type=int, choices=[season.value for season in Anime.AnimeSeason], default=0, help='Season of the generated surveys and anime.')
+        parser.add_argument('--anime', type=int, default=150, help='Amount of anime to generate.')
+        parser.add_argument('--responses', type=int, default=50000, help='Amount of responses to generate per survey.')
+        parser.add_argument('--watch-rate', type=float, default=0.15, help='Average fraction of respondents watching an anime.')
+        parser.add_argument('--score-rate', type=float, default=0.8, help='Fraction of watchers that give a score.')
+        parser.add_argument('--score-mean', type=float, default=3.4, help='Average score of an anime.')
+        parser.add_argument('--score-stddev', type=float, default=1.0, help='Standard deviation of scores given to an anime.')
+        parser.add_argument('--seed', type=int, default=None, help='Seed for the random number generator.')
+        parser.add_argument('--noinput', action='store_false', dest='interactive', help='Do not ask for confirmation.')
+
+    def handle(self, *args, **options) -> Optional[str]:
+        year: int = options['year']
+        season: int = options['season']
+        if Survey.objects.filter(year=year, season=season).exists():
+            raise CommandError('Surveys already exist for this year and season')
+
+        if options['interactive']:
+            answer = input('This will add a lot of data to the database, continue? (Y/N) ')
+            if answer.lower() != 'y':
+                return
+
+        rng = random.Random(options['seed'])
+        now = timezone.now()
+
+        with transaction.atomic():
+            # The pre-season survey is finished, the post-season survey is ongoing so that it can be submitted to
+            preseason_survey = Survey.objects.create(year=year, season=season, is_preseason=True, opening_time=now - timedelta(days=30), closing_time=now - timedelta(days=23))
+            postseason_survey = Survey.objects.create(year=year, season=season, is_preseason=False, opening_time=now - timedelta(days=1), closing_time=now + timedelta(days=7))
+
+            anime_list = self.__generate_anime(rng, year, season, options['anime'])
+            print('Generated %i anime' % len(anime_list))
+
+            # Each anime gets its own popularity and quality, shared between the surveys
+            anime_popularities = {anime.id: min(1.0, rng.expovariate(1 / options['watch_rate'])) for anime in anime_list}
+            anime_score_means = {anime.id: rng.gauss(options['score_mean'], 0.5) for anime in anime_list}
+
+            for survey in [preseason_survey, postseason_survey]:
+                animeresponse_count = self.__generate_responses(rng, survey, anime_list, anime_popularities, anime_score_means, options)
+                print('Generated %i responses and %i anime responses for "%s"' % (options['responses'], animeresponse_count, str(survey)))
+
+            rebuild_counters(postseason_survey)
+
+        # bulk_create doesn't send the signals that clear the cached data of the anime
+        clear_cached_anime_data()
+
+    def __generate_anime(self, rng: random.Random, year: int, season: int, anime_count: int) -> list[Anime]:
+        anime_types = [anime_type for anime_type in Anime.AnimeType]
+        anime_list = Anime.objects.bulk_create([
+            Anime(
+                anime_type=rng.choice(anime_types),
+                start_year=year,
+                start_season=season,
+                end_year=year,
+                end_season=season,
+                subbed_year=year,
+                subbed_season=season,
+            ) for _ in range(anime_count)
+        ])
+
+        AnimeName.objects.bulk_create([
+            animename
+            for idx, anime in enumerate(anime_list)
+            for animename in [
+                AnimeName(anime=anime, anime_name_type=AnimeName.AnimeNameType.JAPANESE_NAME, name='Synthetic Anime %i' % idx),
+                AnimeName(anime=anime, anime_name_type=AnimeName.AnimeNameType.ENGLISH_NAME, name='Synthetic Anime %i (English)' % idx),
+            ]
+        ])
+
+        # The image files themselves don't exist, only their paths are stored
+        Image.objects.bulk_create([
+            Image(
+                anime=anime,
+                name='Key visual',
+                file_original='survey/images/anime/%i/synthetic.jpg' % anime.id,
+                file_small='survey/images/anime/%i/synthetic-small.jpg' % anime.id,
+                file_medium='survey/images/anime/%i/synthetic-medium.jpg' % anime.id,
+                file_large='survey/images/anime/%i/synthetic-large.jpg' % anime.id,
+            ) for anime in anime_list
+        ])
+        return anime_list
+
+    def __generate_responses(self, rng: random.Random, survey: Survey, anime_list: list[Anime], anime_popularities: dict[int, float], anime_score_means: dict[int, float], options) -> int:
+        genders = [Response.Gender.MALE, Response.Gender.FEMALE, Response.Gender.OTHER, None]
+        gender_weights = [70, 20, 5, 5]
+
+        response_list = Response.objects.bulk_create([
+            Response(
+                survey=survey,
+                age=min(80, max(5, round(rng.gauss(23, 5)))) if rng.random() < 0.95 else None,
+                gender=rng.choices(genders, gender_weights)[0],
+            ) for _ in range(options['responses'])
+        ], batch_size=5000)
+
+        animeresponse_count = 0
+        animeresponse_batch: list[AnimeResponse] = []
+        for response in response_list:
+            for anime in anime_list:
+                watching = rng.random() < anime_popularities[anime.id]
+                # Pre-season respondents sometimes give an expected score for anime they won't watch
+                if not watching and not (survey.is_preseason and rng.random() < 0.05):
+                    continue
+
+                score = min(5, max(1, round(rng.gauss(anime_score_means[anime.id], options['score_stddev'])))) if rng.random() < options['score_rate'] else None
+                expectations = None
+                if not survey.is_preseason and watching:
+                    expectations = rng.choices([None, AnimeResponse.Expectations.SURPRISE, AnimeResponse.Expectations.DISAPPOINTMENT], [80, 10, 10])[0]
+
+                animeresponse_batch.append(AnimeResponse(
+                    response=response,
+                    anime=anime,
+                    watching=watching,
+                    score=score,
+                    underwatched=not survey.is_preseason and watching and rng.random() < 0.1,
+                    expectations=expectations,
+                ))
+
+            if len(animeresponse_batch) >= 10000:
+                AnimeResponse.objects.bulk_create(animeresponse_batch)
+                animeresponse_count += len(animeresponse_batch)
+                animeresponse_batch = []
+
+        AnimeResponse.objects.bulk_create(animeresponse_batch)
+        animeresponse_count += len(animeresponse_batch)
+        return animeresponse_count
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandParser
+from survey.models import Anime, Survey
+from survey.util.counters import rebuild_counters
+import sys
+from typing import Optional
+
+class Command(BaseCommand):
+    help = 'Recalculates the live results counters of a survey from its responses.'
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument('year', type=int)
+        parser.add_argument('season', choices=['winter', 'spring', 'summer', 'fall'])
+        parser.add_argument('pre_or_post', choices=['pre', 'post'])
+
+    def handle(self, *args, **options) -> Optional[str]:
+        year: int = options['year']
+        season = self.__parse_season(options['season'])
+        is_preseason: bool = options['pre_or_post'] == 'pre'
+
+        try:
+            survey: Survey = Survey.objects.get(year=year, season=season, is_preseason=is_preseason)
+        except Survey.DoesNotExist:
+            print('That survey does not exist', file=sys.stderr)
+            return
+
+        counter_count = rebuild_counters(survey)
+        print('Rebuilt the counters of %i anime' % counter_count)
+
+    def __parse_season(self, season_str: str) -> Anime.AnimeSeason:
+        if season_str == 'winter':
+            return Anime.AnimeSeason.WINTER
+        elif season_str == 'spring':
+            return Anime.AnimeSeason.SPRING
+        elif season_str == 'summer':
+            return Anime.AnimeSeason.SUMMER
+        else:
+            return Anime.AnimeSeason.FALL
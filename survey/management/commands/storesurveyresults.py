@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from survey.models import Survey
+from survey.util.results import ResultsGenerator
+from typing import Optional
+
+class Command(BaseCommand):
+    help = 'Stores the results of all finished surveys whose results have not been stored yet, e.g. because they were only cached.'
+
+    def handle(self, *args, **options) -> Optional[str]:
+        for survey in Survey.objects.all():
+            if ResultsGenerator(survey).store_anime_results_data():
+                print('Stored the results of "%s"' % str(survey))
@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.http import HttpResponse
+from django.http.request import HttpRequest
+from http import HTTPStatus
+import json
+import logging
+from survey.util.cache import LOCK_WAIT_SECONDS, CacheGenerationTimeout
+from survey.util.http import JsonErrorResponse
+from survey.util.timing import RequestTimings, current_timings, instrument_cache, measure_db_query
+import time
+from typing import Callable
+
+
+class ServerTimingMiddleware:
+    """Measures how much time API requests spend in the database, the caches, the view and JSON encoding.
+
+    The durations are added to the response as a Server-Timing header, which browsers show in their developer tools,
+    and are logged to the 'survey.timing' logger as a JSON line. Only enabled if settings.SERVER_TIMING is set.
+    Should be the first middleware, so that the header isn't stored by the cache middleware along with the response.
+    """
+    TIMED_CACHE_ALIASES = ['default', 'long']
+
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed()
+
+        self.get_response = get_response
+        self.logger = logging.getLogger('survey.timing')
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if not request.path.startswith('/api/'):
+            return self.get_response(request)
+
+        for alias in self.TIMED_CACHE_ALIASES:
+            instrument_cache(caches[alias], alias)
+
+        timings = RequestTimings()
+        token = current_timings.set(timings)
+        start_time = time.perf_counter()
+        try:
+            with connection.execute_wrapper(measure_db_query):
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        end_time = time.perf_counter()
+        total_duration = end_time - start_time
+        # Also includes the process_view hooks of later middleware and their response processing, which is negligible
+        if timings.view_start_time is not None:
+            timings.view_duration = end_time - timings.view_start_time
+
+        response['Server-Timing'] = self.__get_server_timing_header(timings, total_duration)
+        self.logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_duration * 1000, 2),
+            'view_ms': round(timings.view_duration * 1000, 2),
+            'db_ms': round(timings.db_duration * 1000, 2),
+            'db_queries': timings.db_query_count,
+            'cache_ms': {alias: round(duration * 1000, 2) for alias, duration in timings.cache_durations.items()},
+            'cache_calls': timings.cache_call_counts,
+            'encode_ms': round(timings.encode_duration * 1000, 2),
+        }))
+        return response
+
+    def process_view(self, request: HttpRequest, view_func, view_args, view_kwargs):
+        timings = current_timings.get()
+        if timings is not None:
+            timings.view_start_time = time.perf_counter()
+        return None
+
+    def __get_server_timing_header(self, timings: RequestTimings, total_duration: float) -> str:
+        metrics = [
+            'db;dur=%.2f;desc="%i queries"' % (timings.db_duration * 1000, timings.db_query_count),
+            *[
+                'cache-%s;dur=%.2f;desc="%i calls"' % (alias, duration * 1000, timings.cache_call_counts[alias])
+                for alias, duration in timings.cache_durations.items()
+            ],
+            'view;dur=%.2f' % (timings.view_duration * 1000),
+            'encode;dur=%.2f' % (timings.encode_duration * 1000),
+            'total;dur=%.2f' % (total_duration * 1000),
+        ]
+        return ', '.join(metrics)
+
+
+class CacheGenerationTimeoutMiddleware:
+    """Responds with a retryable 503 Service Unavailable when a view gave up waiting for another process to generate a cached value.
+
+    See get_or_set_single_flight, which raises CacheGenerationTimeout rather than generating the value in every waiting process.
+    """
+    def __init__(self, get_response: Callable[[HttpRequest], HttpResponse]):
+        self.get_response = get_response
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        return self.get_response(request)
+
+    def process_exception(self, request: HttpRequest, exception: Exception):
+        if not isinstance(exception, CacheGenerationTimeout):
+            return None
+
+        response = JsonErrorResponse('This page is being generated, please try again in a few seconds.', HTTPStatus.SERVICE_UNAVAILABLE)
+        response['Retry-After'] = str(LOCK_WAIT_SECONDS)
+        return response
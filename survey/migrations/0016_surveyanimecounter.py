@@ -0,0 +1,40 @@
+# Generated by Django 4.2.8 on 2026-10-18 08:40
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0015_add_constraints_and_stuff'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyAnimeCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('watcher_count', models.IntegerField(default=0)),
+                ('male_watcher_count', models.IntegerField(default=0)),
+                ('female_watcher_count', models.IntegerField(default=0)),
+                ('underwatched_count', models.IntegerField(default=0)),
+                ('surprise_count', models.IntegerField(default=0)),
+                ('disappointment_count', models.IntegerField(default=0)),
+                ('score_count', models.IntegerField(default=0)),
+                ('score_sum', models.IntegerField(default=0)),
+                ('male_score_count', models.IntegerField(default=0)),
+                ('male_score_sum', models.IntegerField(default=0)),
+                ('female_score_count', models.IntegerField(default=0)),
+                ('female_score_sum', models.IntegerField(default=0)),
+                ('age_count', models.IntegerField(default=0)),
+                ('age_sum', models.IntegerField(default=0)),
+                ('anime', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='survey.anime')),
+                ('survey', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='survey.survey')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='surveyanimecounter',
+            constraint=models.UniqueConstraint(fields=('survey', 'anime'), name='unique__anime_id__survey_id'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.8 on 2026-10-18 08:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0016_surveyanimecounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyAnimeResult',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('result_type', models.SmallIntegerField()),
+                ('value', models.FloatField(blank=True, null=True)),
+                ('anime', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='survey.anime')),
+                ('survey', models.ForeignKey(editable=False, on_delete=django.db.models.deletion.CASCADE, to='survey.survey')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='surveyanimeresult',
+            constraint=models.UniqueConstraint(fields=('survey', 'anime', 'result_type'), name='unique__anime_id__result_type__survey_id'),
+        ),
+    ]
@@ -341,6 +341,99 @@ class AnimeResponse(models.Model):
 
 
 
+# Running totals of a survey's anime responses per anime, kept up-to-date on every submission for live results
+class SurveyAnimeCounter(models.Model):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['survey', 'anime'], name='unique__anime_id__survey_id'),
+        ]
+
+    # Fields
+    watcher_count = models.IntegerField(
+        default=0,
+    )
+    male_watcher_count = models.IntegerField(
+        default=0,
+    )
+    female_watcher_count = models.IntegerField(
+        default=0,
+    )
+    underwatched_count = models.IntegerField(
+        default=0,
+    )
+    surprise_count = models.IntegerField(
+        default=0,
+    )
+    disappointment_count = models.IntegerField(
+        default=0,
+    )
+    score_count = models.IntegerField(
+        default=0,
+    )
+    score_sum = models.IntegerField(
+        default=0,
+    )
+    male_score_count = models.IntegerField(
+        default=0,
+    )
+    male_score_sum = models.IntegerField(
+        default=0,
+    )
+    female_score_count = models.IntegerField(
+        default=0,
+    )
+    female_score_sum = models.IntegerField(
+        default=0,
+    )
+    age_count = models.IntegerField(
+        default=0,
+    )
+    age_sum = models.IntegerField(
+        default=0,
+    )
+
+    # Relation fields
+    survey = models.ForeignKey(
+        to='Survey',
+        on_delete=models.CASCADE,
+        editable=False,
+    )
+    anime = models.ForeignKey(
+        to='Anime',
+        on_delete=models.CASCADE,
+        editable=False,
+    )
+
+
+
+# Final result values of a finished survey, so that they don't have to be regenerated when the results cache is lost
+class SurveyAnimeResult(models.Model):
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['survey', 'anime', 'result_type'], name='unique__anime_id__result_type__survey_id'),
+        ]
+
+    # Fields
+    result_type = models.SmallIntegerField()
+    value = models.FloatField(
+        blank=True,
+        null=True,
+    )
+
+    # Relation fields
+    survey = models.ForeignKey(
+        to='Survey',
+        on_delete=models.CASCADE,
+        editable=False,
+    )
+    anime = models.ForeignKey(
+        to='Anime',
+        on_delete=models.CASCADE,
+        editable=False,
+    )
+
+
+
 class MtmUserResponse(models.Model):
     class Meta:
         constraints = [
@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.db.models.signals import post_save, pre_delete
+from django.dispatch import receiver
+from survey.models import Anime, AnimeName, Image, Survey
+from survey.util.results import ResultsGenerator, clear_cached_anime_data
+from survey.util.survey import get_surveys_with_anime
+
+
+@receiver([post_save, pre_delete], sender=Survey)
+@receiver([post_save, pre_delete], sender=Anime)
+@receiver([post_save, pre_delete], sender=AnimeName)
+@receiver([post_save, pre_delete], sender=Image)
+def clear_cached_anime_data_on_change(sender, instance, signal, **kwargs):
+    """Removes the cached data containing a survey or anime once it, or one of the anime's names or images, was saved or deleted.
+
+    This only happens for individual saves and deletes, after bulk operations (e.g. bulk_create or QuerySet.update) clear_cached_anime_data
+    has to be called explicitly. Deletions are handled before they happen, as the finished surveys containing a deleted anime are found
+    through its stored results, which are deleted along with it.
+    """
+    if sender is Survey:
+        survey_list = [instance]
+    else:
+        survey_list = get_surveys_with_anime(instance if sender is Anime else instance.anime)
+
+    if sender is Anime and signal is pre_delete:
+        # The cached results of finished surveys still contain the deleted anime, so they're generated again without it
+        for survey in survey_list:
+            if survey.state == Survey.State.FINISHED:
+                transaction.on_commit(ResultsGenerator(survey).clear_anime_results_data)
+
+    # Clearing it before the change is committed would let a concurrent request cache the old data again
+    transaction.on_commit(lambda: clear_cached_anime_data(survey_list))
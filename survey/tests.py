@@ -1,3 +1,986 @@
-from django.test import TestCase
+from contextlib import redirect_stdout
+from datetime import timedelta
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+import gzip
+from io import StringIO
+import json
+import os
+from survey.admin import ResponseAdmin
+from survey.models import Anime, AnimeName, AnimeResponse, Image, Response, Survey, SurveyAdditionRemoval, SurveyAnimeCounter, SurveyAnimeResult
+from survey.util.cache import LOCK_STALE_SECONDS, LOCK_WAIT_SECONDS, CacheGenerationTimeout, delete_single_flight, get_or_set_single_flight, release_lock, try_acquire_lock
+from survey.util.counters import rebuild_counters
+from survey.util.data import AnimeNameViewModel, AnimeViewModel, ImageViewModel, ResultType
+from survey.util.results import INDEX_RESPONSE_CACHE_KEY, ResultsGenerator, get_adjusted_response_count, get_adjusted_response_counts, get_results_response_cache_key
+from survey.util.results_numpy import get_bootstrap_confidence_intervals
+from survey.util.snapshots import get_index_snapshot_path, get_results_snapshot_path
+from survey.util.survey import get_survey_image_ids, get_surveys_with_anime
+from survey.views.api.index import INDEX_CACHE_MAX_TIMEOUT, get_index_cache_timeout
+from survey.views.api.survey_comparison import AnimeComparisonViewModel, get_results_comparison
+from survey.views.api.survey_results import ResultsSelection, get_columnar_results
+import tempfile
+import threading
+import time
+from typing import Optional
+from unittest.mock import patch
 
-# Create your tests here.
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-default',
+    },
+    'long': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'test-long',
+    },
+}
+
+
+@override_settings(CACHES=TEST_CACHES, CACHE_LOCK_DIR=tempfile.mkdtemp())
+class QueryBudgetTestCase(TestCase):
+    """Checks that the amount of queries of each API view stays within its budget, and doesn't grow with the amount of anime or responses.
+
+    Each test measures the queries of a request on a small dataset, grows the dataset, and measures the same request again.
+    All caches are cleared before each measurement, so both measurements take the same (uncached) code path.
+    """
+    # The maximum amount of queries of each view, including queries done by middleware (sessions, authentication)
+    QUERY_BUDGETS = {
+        'index': 18,
+        'user': 3,
+        'anime_history': 4,
+        'survey_comparison': 17,
+        'survey_form_get': 11,
+        'survey_form_put': 24,
+        'survey_missing_anime_put': 4,
+        'survey_results_finished': 11,
+        'survey_results_ongoing': 11,
+        'survey_results_ongoing_selection': 12,
+        'survey_demographic_results': 5,
+    }
+
+    SMALL_ANIME_COUNT = 3
+    SMALL_RESPONSE_COUNT = 2
+    LARGE_ANIME_COUNT = 12
+    LARGE_RESPONSE_COUNT = 8
+
+    def setUp(self):
+        now = timezone.now()
+        self.year = 2020
+        # Pre- and post-season surveys of the first season are finished, the pre-season survey of the next season is ongoing
+        self.preseason_survey = Survey.objects.create(year=self.year, season=Anime.AnimeSeason.WINTER, is_preseason=True, opening_time=now - timedelta(days=100), closing_time=now - timedelta(days=90))
+        self.postseason_survey = Survey.objects.create(year=self.year, season=Anime.AnimeSeason.WINTER, is_preseason=False, opening_time=now - timedelta(days=10), closing_time=now - timedelta(days=5))
+        self.ongoing_survey = Survey.objects.create(year=self.year, season=Anime.AnimeSeason.SPRING, is_preseason=True, opening_time=now - timedelta(days=1), closing_time=now + timedelta(days=5))
+
+        self.user = User.objects.create(username='tester', is_staff=True)
+        self.anime_list: list[Anime] = []
+        self.response_counts: dict[int, int] = {}
+
+        self.add_data(self.SMALL_ANIME_COUNT, self.SMALL_RESPONSE_COUNT)
+
+    def add_data(self, anime_count: int, response_count: int):
+        """Adds anime until there are anime_count anime, and responses until each survey has response_count responses."""
+        for idx in range(len(self.anime_list), anime_count):
+            anime = Anime.objects.create(
+                anime_type=Anime.AnimeType.TV_SERIES if idx % 2 else Anime.AnimeType.MOVIE,
+                start_year=self.year, start_season=Anime.AnimeSeason.WINTER,
+                end_year=self.year, end_season=Anime.AnimeSeason.SPRING,
+                subbed_year=self.year, subbed_season=Anime.AnimeSeason.WINTER,
+            )
+            AnimeName.objects.create(anime=anime, anime_name_type=AnimeName.AnimeNameType.JAPANESE_NAME, name='Anime %i' % idx)
+            AnimeName.objects.create(anime=anime, anime_name_type=AnimeName.AnimeNameType.ENGLISH_NAME, name='Anime %i (English)' % idx)
+            Image.objects.create(anime=anime, name='Image', file_original='a.jpg', file_small='s.jpg', file_medium='m.jpg', file_large='l.jpg')
+            self.anime_list.append(anime)
+
+        genders = [Response.Gender.MALE, Response.Gender.FEMALE, Response.Gender.OTHER, None]
+        for survey in [self.preseason_survey, self.postseason_survey, self.ongoing_survey]:
+            for idx in range(self.response_counts.get(survey.id, 0), response_count):
+                response = Response.objects.create(survey=survey, age=18 + idx, gender=genders[idx % len(genders)])
+                AnimeResponse.objects.bulk_create([
+                    AnimeResponse(response=response, anime=anime, watching=(idx + anime_idx) % 3 != 0, score=(idx + anime_idx) % 5 + 1, underwatched=idx % 2 == 0, expectations=None)
+                    for anime_idx, anime in enumerate(self.anime_list)
+                ])
+            self.response_counts[survey.id] = response_count
+            rebuild_counters(survey)
+
+    def clear_caches(self):
+        caches['default'].clear()
+        caches['long'].clear()
+        SurveyAnimeResult.objects.all().delete()
+
+    def get_query_count(self, request_func, setup_func=None) -> int:
+        if setup_func:
+            setup_func()
+        self.clear_caches()
+        with CaptureQueriesContext(connection) as captured_queries:
+            response = request_func()
+        self.assertLess(response.status_code, 400, response.content)
+        return len(captured_queries)
+
+    def assertQueryBudget(self, budget_name: str, request_func, setup_func=None):
+        small_query_count = self.get_query_count(request_func, setup_func)
+        self.add_data(self.LARGE_ANIME_COUNT, self.LARGE_RESPONSE_COUNT)
+        large_query_count = self.get_query_count(request_func, setup_func)
+
+        self.assertEqual(small_query_count, large_query_count, 'The amount of queries grows with the amount of anime/responses')
+        self.assertLessEqual(large_query_count, self.QUERY_BUDGETS[budget_name], 'The amount of queries exceeds the budget')
+
+    def survey_url(self, survey: Survey, suffix: str = '') -> str:
+        return '/api/survey/%i/%i/%s/%s' % (survey.year, survey.season, 'pre' if survey.is_preseason else 'post', suffix)
+
+    def put_form(self, score: int):
+        """Submits a response to the ongoing survey for every anime."""
+        return self.client.put(self.survey_url(self.ongoing_survey), self.form_data(score), content_type='application/json')
+
+    def form_data(self, score: int) -> str:
+        return json.dumps({
+            'response_data': {'age': 20, 'gender': Response.Gender.FEMALE},
+            'anime_response_data_dict': {
+                str(anime.id): {'score': score, 'watching': True, 'underwatched': False, 'expectations': None}
+                for anime in self.anime_list
+            },
+            'is_response_linked_to_user': True,
+        })
+
+    def test_index(self):
+        self.assertQueryBudget('index', lambda: self.client.get('/api/index/'))
+
+    def test_user(self):
+        self.client.force_login(self.user)
+        self.assertQueryBudget('user', lambda: self.client.get('/api/user/'))
+
+    def test_anime_history(self):
+        self.assertQueryBudget('anime_history', lambda: self.client.get('/api/anime/%i/history/' % self.anime_list[0].id))
+
+    def test_survey_comparison(self):
+        self.assertQueryBudget('survey_comparison', lambda: self.client.get('/api/survey/%i/%i/comparison/' % (self.year, Anime.AnimeSeason.WINTER)))
+
+    def test_survey_form_get(self):
+        self.client.force_login(self.user)
+        self.assertQueryBudget('survey_form_get', lambda: self.client.get(self.survey_url(self.ongoing_survey)), lambda: self.put_form(3))
+
+    def test_survey_form_get_cached_catalogue(self):
+        self.client.force_login(self.user)
+        self.put_form(3)
+        self.clear_caches()
+
+        response = self.client.get(self.survey_url(self.ongoing_survey))
+        with CaptureQueriesContext(connection) as captured_queries:
+            cached_response = self.client.get(self.survey_url(self.ongoing_survey))
+        self.assertLess(len(captured_queries), self.QUERY_BUDGETS['survey_form_get'])
+        self.assertEqual(cached_response.content, response.content)
+
+        form_data = json.loads(response.content)
+        self.assertEqual(list(form_data.keys()), ['survey', 'response_data', 'anime_data_dict', 'anime_response_data_dict', 'is_anime_new_dict', 'is_response_linked_to_user'])
+        self.assertEqual(form_data['anime_data_dict'].keys(), form_data['anime_response_data_dict'].keys())
+        self.assertEqual({anime_response_data['score'] for anime_response_data in form_data['anime_response_data_dict'].values()}, {3})
+
+    def test_survey_form_catalogue_cleared(self):
+        self.client.force_login(self.user)
+        for change_catalogue_data in [
+            lambda: AnimeName.objects.create(anime=self.anime_list[0], anime_name_type=AnimeName.AnimeNameType.ENGLISH_NAME, name='Renamed anime'),
+            lambda: self.anime_list[0].save(),
+            lambda: self.ongoing_survey.save(),
+        ]:
+            self.client.get(self.survey_url(self.ongoing_survey))
+            self.assertIsNotNone(caches['long'].get('survey_form_catalogue_%i' % self.ongoing_survey.id, version=1))
+            with self.captureOnCommitCallbacks(execute=True):
+                change_catalogue_data()
+            self.assertIsNone(caches['long'].get('survey_form_catalogue_%i' % self.ongoing_survey.id, version=1))
+
+    def test_survey_form_put(self):
+        self.client.force_login(self.user)
+        # Every measured submission changes the scores of a previous submission, so it takes the same code path each time
+        self.assertQueryBudget('survey_form_put', lambda: self.put_form(4), lambda: self.put_form(3))
+
+    def test_survey_missing_anime_put(self):
+        self.client.force_login(self.user)
+        data = json.dumps({'name': 'Missing anime', 'link': 'https://myanimelist.net/', 'description': ''})
+        self.assertQueryBudget('survey_missing_anime_put', lambda: self.client.put(self.survey_url(self.ongoing_survey, 'missinganime/'), data, content_type='application/json'))
+
+    def test_survey_results_finished(self):
+        self.assertQueryBudget('survey_results_finished', lambda: self.client.get(self.survey_url(self.postseason_survey, 'results/')))
+
+    def test_survey_results_ongoing(self):
+        self.client.force_login(self.user)
+        self.assertQueryBudget('survey_results_ongoing', lambda: self.client.get(self.survey_url(self.ongoing_survey, 'results/')))
+
+    def test_survey_results_ongoing_selection(self):
+        self.client.force_login(self.user)
+        self.assertQueryBudget('survey_results_ongoing_selection', lambda: self.client.get(self.survey_url(self.ongoing_survey, 'results/'), {'top': 2, 'bottom': 2}))
+
+    def test_survey_demographic_results(self):
+        self.assertQueryBudget('survey_demographic_results', lambda: self.client.get(self.survey_url(self.postseason_survey, 'results/demographics/?age=18-24&gender=F')))
+
+
+
+@override_settings(CACHES=TEST_CACHES, CACHE_LOCK_DIR=tempfile.mkdtemp(), SERVER_TIMING=True)
+class ServerTimingTestCase(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['long'].clear()
+
+    def test_server_timing_header(self):
+        now = timezone.now()
+        Survey.objects.create(year=2020, season=Anime.AnimeSeason.WINTER, is_preseason=True, opening_time=now - timedelta(days=10), closing_time=now - timedelta(days=5))
+
+        with self.assertLogs('survey.timing', level='INFO') as logs:
+            response = self.client.get('/api/index/')
+
+        metric_names = [metric.split(';')[0].strip() for metric in response['Server-Timing'].split(',')]
+        for metric_name in ['db', 'cache-default', 'view', 'encode', 'total']:
+            self.assertIn(metric_name, metric_names)
+
+        log_data = json.loads(logs.records[0].getMessage())
+        self.assertEqual(log_data['path'], '/api/index/')
+        self.assertGreater(log_data['db_queries'], 0)
+
+
+
+@override_settings(CACHES=TEST_CACHES, CACHE_LOCK_DIR=tempfile.mkdtemp())
+class SurveyResultsResponseCacheTestCase(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['long'].clear()
+
+        now = timezone.now()
+        self.survey = Survey.objects.create(year=2020, season=Anime.AnimeSeason.WINTER, is_preseason=True, opening_time=now - timedelta(days=10), closing_time=now - timedelta(days=5))
+        self.url = '/api/survey/2020/%i/pre/results/' % Anime.AnimeSeason.WINTER
+
+    def test_not_modified(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        with self.assertNumQueries(0):
+            cached_response = self.client.get(self.url)
+        self.assertEqual(cached_response.status_code, 200)
+        self.assertEqual(cached_response.content, response.content)
+
+        with self.assertNumQueries(0):
+            not_modified_response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(not_modified_response.status_code, 304)
+        self.assertEqual(not_modified_response['ETag'], etag)
+
+    def test_cleared_with_results(self):
+        etag = self.client.get(self.url)['ETag']
+        ResultsGenerator(self.survey).clear_anime_results_data()
+
+        # The response is generated again, but is still the same
+        with CaptureQueriesContext(connection) as captured_queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertGreater(len(captured_queries), 0)
+        self.assertEqual(response.status_code, 304)
+
+    def test_compressed(self):
+        response = self.client.get(self.url)
+
+        gzip_response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='br;q=0, gzip, deflate')
+        self.assertEqual(gzip_response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(gzip_response.content), response.content)
+        self.assertNotEqual(gzip_response['ETag'], response['ETag'])
+
+        not_modified_response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=gzip_response['ETag'])
+        self.assertEqual(not_modified_response.status_code, 304)
+
+    def test_columnar_format(self):
+        default_response = self.client.get(self.url)
+        columnar_response = self.client.get(self.url, {'format': 'columnar'})
+        self.assertEqual(columnar_response.status_code, 200)
+        self.assertNotEqual(columnar_response['ETag'], default_response['ETag'])
+        self.assertEqual(json.loads(columnar_response.content)['anime_ids'], [])
+
+        self.assertEqual(self.client.get(self.url, {'format': 'unknown'}).status_code, 400)
+
+    def test_selection(self):
+        response = self.client.get(self.url, {'result_types': '%i,%i' % (ResultType.POPULARITY, ResultType.SCORE), 'top': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertEqual(json.loads(response.content)['rankings'], {str(ResultType.POPULARITY.value): {'top': [], 'bottom': []}, str(ResultType.SCORE.value): {'top': [], 'bottom': []}})
+
+        self.assertEqual(self.client.get(self.url, {'top': 'all'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'result_types': '999'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'anime_group': 'movie'}).status_code, 400)
+
+
+
+@override_settings(CACHES=TEST_CACHES, CACHE_LOCK_DIR=tempfile.mkdtemp())
+class SingleFlightCacheTestCase(TestCase):
+    KEY = 'single_flight_test'
+
+    def setUp(self):
+        caches['long'].clear()
+        self.cache = caches['long']
+        self.default_call_count = 0
+
+    def default(self) -> str:
+        self.default_call_count += 1
+        return 'generated'
+
+    def hold_lock(self, key: str = KEY, version: int = 1) -> str:
+        """Creates the lock file of a key as if another process is generating its value, returns its path."""
+        lock_path = os.path.join(settings.CACHE_LOCK_DIR, '%s.%s.lock' % (key, version))
+        self.assertTrue(try_acquire_lock(lock_path))
+        self.addCleanup(release_lock, lock_path)
+        return lock_path
+
+    def test_generated_once(self):
+        self.assertEqual(get_or_set_single_flight(self.cache, self.KEY, self.default, version=1), 'generated')
+        self.assertEqual(get_or_set_single_flight(self.cache, self.KEY, self.default, version=1), 'generated')
+        self.assertEqual(self.default_call_count, 1)
+
+    def test_previous_value_while_locked(self):
+        get_or_set_single_flight(self.cache, self.KEY, self.default, version=1)
+        self.cache.delete(self.KEY, version=1)
+        self.hold_lock()
+
+        with patch('survey.util.cache.LOCK_WAIT_SECONDS', 0):
+            self.assertEqual(get_or_set_single_flight(self.cache, self.KEY, lambda: 'regenerated', version=1), 'generated')
+
+        # Values that are deleted because their data changed don't leave a previous value behind
+        delete_single_flight(self.cache, [self.KEY], version=1)
+        with patch('survey.util.cache.LOCK_WAIT_SECONDS', 0), self.assertRaises(CacheGenerationTimeout):
+            get_or_set_single_flight(self.cache, self.KEY, self.default, version=1)
+
+    def test_waits_for_lock_holder(self):
+        self.hold_lock()
+        timer = threading.Timer(0.3, lambda: self.cache.set(self.KEY, 'set by holder', version=1))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        self.assertEqual(get_or_set_single_flight(self.cache, self.KEY, self.default, version=1), 'set by holder')
+        self.assertEqual(self.default_call_count, 0)
+
+    def test_generated_when_lock_holder_fails(self):
+        lock_path = self.hold_lock()
+        timer = threading.Timer(0.3, release_lock, [lock_path])
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        self.assertEqual(get_or_set_single_flight(self.cache, self.KEY, self.default, version=1), 'generated')
+        self.assertEqual(self.default_call_count, 1)
+
+    def test_stale_lock_replaced(self):
+        lock_path = self.hold_lock()
+        stale_time = time.time() - LOCK_STALE_SECONDS - 1
+        os.utime(lock_path, (stale_time, stale_time))
+
+        self.assertEqual(get_or_set_single_flight(self.cache, self.KEY, self.default, version=1), 'generated')
+        self.assertFalse(os.path.exists(lock_path))
+
+    def test_timeout_response(self):
+        now = timezone.now()
+        survey = Survey.objects.create(year=2020, season=Anime.AnimeSeason.WINTER, is_preseason=True, opening_time=now - timedelta(days=10), closing_time=now - timedelta(days=5))
+        self.hold_lock(get_results_response_cache_key(survey.year, survey.season, survey.is_preseason), version=2)
+
+        with patch('survey.util.cache.LOCK_WAIT_SECONDS', 0):
+            response = self.client.get('/api/survey/2020/%i/pre/results/' % Anime.AnimeSeason.WINTER)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], str(LOCK_WAIT_SECONDS))
+
+
+
+@override_settings(CACHES=TEST_CACHES, CACHE_LOCK_DIR=tempfile.mkdtemp())
+class StaticSnapshotTestCase(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['long'].clear()
+
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(static_root.cleanup)
+        self.static_root_settings = override_settings(STATIC_ROOT=static_root.name)
+        self.static_root_settings.enable()
+        self.addCleanup(self.static_root_settings.disable)
+
+        now = timezone.now()
+        self.survey = Survey.objects.create(year=2020, season=Anime.AnimeSeason.WINTER, is_preseason=True, opening_time=now - timedelta(days=10), closing_time=now - timedelta(days=5))
+        self.url = '/api/survey/2020/%i/pre/results/' % Anime.AnimeSeason.WINTER
+        self.results_snapshot_path = get_results_snapshot_path(self.survey.year, self.survey.season, self.survey.is_preseason)
+
+    def test_not_exported_by_requests(self):
+        self.client.get(self.url)
+        self.assertFalse(self.results_snapshot_path.exists())
+        self.assertFalse(get_index_snapshot_path().exists())
+
+    def test_exported(self):
+        with redirect_stdout(StringIO()):
+            call_command('exportsnapshots')
+        self.assertEqual(self.results_snapshot_path.read_bytes(), self.client.get(self.url).content)
+        self.assertEqual(json.loads(get_index_snapshot_path().read_bytes()), json.loads(self.client.get('/api/index/').content))
+
+    def test_missing_exported(self):
+        with redirect_stdout(StringIO()):
+            call_command('exportsnapshots')
+        self.results_snapshot_path.write_bytes(b'{}')
+
+        with redirect_stdout(StringIO()):
+            call_command('exportsnapshots', missing=True)
+        self.assertEqual(self.results_snapshot_path.read_bytes(), b'{}')
+
+        ResultsGenerator(self.survey).clear_anime_results_data()
+        with redirect_stdout(StringIO()):
+            call_command('exportsnapshots', missing=True)
+        self.assertEqual(self.results_snapshot_path.read_bytes(), self.client.get(self.url).content)
+
+    def test_cleared_with_results(self):
+        with redirect_stdout(StringIO()):
+            call_command('exportsnapshots')
+        ResultsGenerator(self.survey).clear_anime_results_data()
+        self.assertFalse(self.results_snapshot_path.exists())
+        self.assertFalse(get_index_snapshot_path().exists())
+
+    def test_index_not_exported_with_ongoing_survey(self):
+        now = timezone.now()
+        Survey.objects.create(year=2020, season=Anime.AnimeSeason.SPRING, is_preseason=True, opening_time=now - timedelta(days=1), closing_time=now + timedelta(days=5))
+
+        with redirect_stdout(StringIO()):
+            call_command('exportsnapshots')
+        self.assertTrue(self.results_snapshot_path.exists())
+        self.assertTrue(get_results_snapshot_path(self.survey.year, self.survey.season, self.survey.is_preseason, 'columnar').exists())
+        self.assertFalse(get_index_snapshot_path().exists())
+
+
+
+@override_settings(CACHES=TEST_CACHES, CACHE_LOCK_DIR=tempfile.mkdtemp())
+class IndexResponseCacheTestCase(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['long'].clear()
+
+        now = timezone.now()
+        Survey.objects.create(year=2020, season=Anime.AnimeSeason.WINTER, is_preseason=True, opening_time=now - timedelta(days=10), closing_time=now - timedelta(days=5))
+
+    def test_cached(self):
+        response = self.client.get('/api/index/')
+        with self.assertNumQueries(0):
+            cached_response = self.client.get('/api/index/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached_response.status_code, 304)
+
+    def test_cleared(self):
+        self.client.get('/api/index/')
+        now = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            Survey.objects.create(year=2020, season=Anime.AnimeSeason.SPRING, is_preseason=True, opening_time=now + timedelta(days=1), closing_time=now + timedelta(days=5))
+        self.assertEqual(len(json.loads(self.client.get('/api/index/').content)), 2)
+
+    def test_year_not_cached(self):
+        response = self.client.get('/api/index/', {'year': 2020})
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(len(json.loads(response.content)), 1)
+
+        now = timezone.now()
+        Survey.objects.create(year=2020, season=Anime.AnimeSeason.SPRING, is_preseason=True, opening_time=now - timedelta(days=1), closing_time=now + timedelta(days=5))
+        self.assertEqual(len(json.loads(self.client.get('/api/index/', {'year': 2020}).content)), 2)
+
+    def test_cleared_with_anime(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            anime = Anime.objects.create(anime_type=Anime.AnimeType.TV_SERIES, start_year=2020, start_season=Anime.AnimeSeason.WINTER)
+
+        for change_anime in [
+            lambda: AnimeName.objects.create(anime=anime, anime_name_type=AnimeName.AnimeNameType.JAPANESE_NAME, name='Anime'),
+            lambda: Image.objects.create(anime=anime, name='Image', file_original='a.jpg', file_small='s.jpg', file_medium='m.jpg', file_large='l.jpg'),
+            lambda: anime.save(),
+        ]:
+            self.client.get('/api/index/')
+            self.assertIsNotNone(caches['long'].get(INDEX_RESPONSE_CACHE_KEY, version=1))
+            with self.captureOnCommitCallbacks(execute=True):
+                change_anime()
+            self.assertIsNone(caches['long'].get(INDEX_RESPONSE_CACHE_KEY, version=1))
+
+    def test_upcoming_survey_images(self):
+        now = timezone.now()
+        upcoming_survey = Survey.objects.create(year=2020, season=Anime.AnimeSeason.SPRING, is_preseason=True, opening_time=now + timedelta(days=1), closing_time=now + timedelta(days=5))
+        anime = Anime.objects.create(anime_type=Anime.AnimeType.TV_SERIES, start_year=2020, start_season=Anime.AnimeSeason.SPRING)
+        image = Image.objects.create(anime=anime, name='Image', file_original='a.jpg', file_small='s.jpg', file_medium='m.jpg', file_large='l.jpg')
+
+        self.assertEqual(get_survey_image_ids(upcoming_survey), [image.id])
+        index_data = json.loads(self.client.get('/api/index/').content)
+        self.assertEqual([survey_data['anime_images'] for survey_data in index_data], [[ImageViewModel.from_model(image).to_dict()], None])
+
+        # The cached image ids are cleared once the image's deletion is committed
+        with self.captureOnCommitCallbacks(execute=True):
+            image.delete()
+        self.assertEqual(get_survey_image_ids(upcoming_survey), [])
+
+        # Which images are in the survey also depends on the anime and on the survey's season
+        with self.captureOnCommitCallbacks(execute=True):
+            Image.objects.create(anime=anime, name='Image', file_original='a.jpg', file_small='s.jpg', file_medium='m.jpg', file_large='l.jpg')
+        self.assertEqual(len(get_survey_image_ids(upcoming_survey)), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            anime.start_year = 2021
+            anime.save()
+        self.assertEqual(get_survey_image_ids(upcoming_survey), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            upcoming_survey.year = 2021
+            upcoming_survey.save()
+        self.assertEqual(len(get_survey_image_ids(upcoming_survey)), 1)
+
+    def test_cache_timeout(self):
+        now = timezone.now()
+        survey_list = list(Survey.objects.all())
+        self.assertEqual(get_index_cache_timeout(survey_list), INDEX_CACHE_MAX_TIMEOUT)
+
+        survey_list.append(Survey(year=2020, season=Anime.AnimeSeason.SPRING, is_preseason=True, opening_time=now + timedelta(minutes=10), closing_time=now + timedelta(days=5)))
+        self.assertAlmostEqual(get_index_cache_timeout(survey_list), 10*60, delta=5)
+
+
+
+class ResultsSelectionTestCase(TestCase):
+    RESULTS = {
+        1: {ResultType.POPULARITY: 0.5, ResultType.SCORE: 4.0},
+        2: {ResultType.POPULARITY: 0.3, ResultType.SCORE: 2.0},
+        3: {ResultType.POPULARITY: 0.01, ResultType.SCORE: 5.0},
+        4: {ResultType.POPULARITY: 0.1, ResultType.SCORE: 3.0},
+    }
+    RESULT_RANKINGS = {
+        'rankings': {
+            ResultType.POPULARITY: [1, 2, 4, 3],
+            ResultType.SCORE: [3, 1, 4, 2],
+        },
+        'series_anime_ids': {1, 2, 3},
+    }
+
+    def test_top_and_bottom(self):
+        selection = ResultsSelection(result_types=[ResultType.SCORE], top=1, bottom=1)
+        results, rankings = selection.select(self.RESULTS, self.RESULT_RANKINGS)
+
+        # Anime 3 is below the popularity threshold
+        self.assertEqual(rankings, {ResultType.SCORE: {'top': [1], 'bottom': [2]}})
+        self.assertEqual(results, {1: {ResultType.SCORE: 4.0}, 2: {ResultType.SCORE: 2.0}})
+
+    def test_anime_group(self):
+        results, rankings = ResultsSelection(anime_group='special').select(self.RESULTS, self.RESULT_RANKINGS)
+        self.assertIsNone(rankings)
+        self.assertEqual(results, {4: self.RESULTS[4]})
+
+        _, rankings = ResultsSelection(result_types=[ResultType.POPULARITY], anime_group='series', bottom=2, min_popularity=0).select(self.RESULTS, self.RESULT_RANKINGS)
+        self.assertEqual(rankings, {ResultType.POPULARITY: {'top': [], 'bottom': [3, 2]}})
+
+
+
+class ColumnarResultsTestCase(TestCase):
+    def test_get_columnar_results(self):
+        results = {
+            1: {ResultType.POPULARITY: 0.123456789, ResultType.SCORE: 3.5},
+            2: {ResultType.POPULARITY: 0.5, ResultType.SCORE: None},
+        }
+        anime_data_dict = {
+            1: AnimeViewModel(id=1, names=[AnimeNameViewModel(name='A', is_official=True, type=AnimeName.AnimeNameType.JAPANESE_NAME)], images=[], anime_type=Anime.AnimeType.TV_SERIES),
+            2: AnimeViewModel(id=2, names=[], images=[ImageViewModel(name='I', url_small='s', url_medium='m', url_large='l')], anime_type=Anime.AnimeType.MOVIE),
+        }
+
+        columnar_results = get_columnar_results(results, anime_data_dict)
+        self.assertEqual(columnar_results['anime_ids'], [1, 2])
+        self.assertEqual(columnar_results['results'], {ResultType.POPULARITY: [0.12346, 0.5], ResultType.SCORE: [3.5, None]})
+        self.assertEqual(columnar_results['anime'], {
+            'anime_types': [Anime.AnimeType.TV_SERIES, Anime.AnimeType.MOVIE],
+            'names': [[['A', True, AnimeName.AnimeNameType.JAPANESE_NAME]], []],
+            'images': [[], [['I', 's', 'm', 'l']]],
+        })
+
+
+
+class ResultsComparisonTestCase(TestCase):
+    def test_get_results_comparison(self):
+        preseason_results = {
+            1: {ResultType.SCORE: 3.0, ResultType.POPULARITY: 0.5},
+            2: {ResultType.SCORE: 4.0, ResultType.POPULARITY: 0.25},
+            3: {ResultType.SCORE: None, ResultType.POPULARITY: 0.125},
+            # Only in the pre-season survey, so it's neither compared nor ranked
+            4: {ResultType.SCORE: 5.0, ResultType.POPULARITY: 1.0},
+        }
+        postseason_results = {
+            1: {ResultType.SCORE: 3.5, ResultType.POPULARITY: 0.375},
+            2: {ResultType.SCORE: 3.0, ResultType.POPULARITY: 0.5},
+            3: {ResultType.SCORE: 2.0, ResultType.POPULARITY: 0.0},
+            5: {ResultType.SCORE: 1.0, ResultType.POPULARITY: 0.75},
+        }
+
+        self.assertEqual(get_results_comparison(preseason_results, postseason_results), {
+            1: AnimeComparisonViewModel(
+                preseason_score=3.0, postseason_score=3.5, score_difference=0.5, preseason_score_rank=2, postseason_score_rank=1,
+                preseason_popularity=0.5, postseason_popularity=0.375, popularity_difference=-0.125, preseason_popularity_rank=1, postseason_popularity_rank=2,
+            ),
+            2: AnimeComparisonViewModel(
+                preseason_score=4.0, postseason_score=3.0, score_difference=-1.0, preseason_score_rank=1, postseason_score_rank=2,
+                preseason_popularity=0.25, postseason_popularity=0.5, popularity_difference=0.25, preseason_popularity_rank=2, postseason_popularity_rank=1,
+            ),
+            # Anime without a result have no difference or rank for it
+            3: AnimeComparisonViewModel(
+                preseason_score=None, postseason_score=2.0, score_difference=None, preseason_score_rank=None, postseason_score_rank=3,
+                preseason_popularity=0.125, postseason_popularity=0.0, popularity_difference=-0.125, preseason_popularity_rank=3, postseason_popularity_rank=3,
+            ),
+        })
+
+
+
+@override_settings(CACHES=TEST_CACHES, CACHE_LOCK_DIR=tempfile.mkdtemp(), RESULTS_CONFIDENCE_INTERVALS=False)
+class ResultsGeneratorTestCase(TestCase):
+    """Checks the results generated from the grouped aggregates of a small survey whose results were calculated by hand."""
+    def setUp(self):
+        caches['default'].clear()
+        caches['long'].clear()
+
+        now = timezone.now()
+        self.preseason_survey = Survey.objects.create(year=2020, season=Anime.AnimeSeason.WINTER, is_preseason=True, opening_time=now - timedelta(days=100), closing_time=now - timedelta(days=90))
+        self.postseason_survey = Survey.objects.create(year=2020, season=Anime.AnimeSeason.WINTER, is_preseason=False, opening_time=now - timedelta(days=10), closing_time=now - timedelta(days=5))
+
+        anime_kwargs = dict(
+            anime_type=Anime.AnimeType.TV_SERIES,
+            start_year=2020, start_season=Anime.AnimeSeason.WINTER,
+            end_year=2020, end_season=Anime.AnimeSeason.SPRING,
+        )
+        self.anime = Anime.objects.create(**anime_kwargs)
+        # Nobody responded to this anime, so all its results are empty
+        self.unwatched_anime = Anime.objects.create(**anime_kwargs)
+
+        # (gender, age, watching, score, underwatched, expectations)
+        response_rows = [
+            (Response.Gender.MALE,   20,   True,  5,    False, AnimeResponse.Expectations.SURPRISE),
+            (Response.Gender.FEMALE, 30,   True,  3,    True,  None),
+            (Response.Gender.OTHER,  None, False, 1,    False, None),
+            (None,                   25,   True,  None, False, AnimeResponse.Expectations.DISAPPOINTMENT),
+        ]
+        for survey in [self.preseason_survey, self.postseason_survey]:
+            for gender, age, watching, score, underwatched, expectations in response_rows:
+                response = Response.objects.create(survey=survey, age=age, gender=gender)
+                AnimeResponse.objects.create(response=response, anime=self.anime, watching=watching, score=score, underwatched=underwatched, expectations=expectations)
+
+    def assertResultsAlmostEqual(self, results: dict[ResultType, float], expected_results: dict[ResultType, float]):
+        self.assertEqual(results.keys(), expected_results.keys())
+        for resulttype, expected_value in expected_results.items():
+            if expected_value is None:
+                self.assertIsNone(results[resulttype], resulttype)
+            else:
+                self.assertAlmostEqual(results[resulttype], expected_value, msg=resulttype)
+
+    def get_expected_results(self, score: float) -> dict[ResultType, float]:
+        return {
+            ResultType.POPULARITY: 3/4,
+            ResultType.POPULARITY_MALE: 1.0,
+            ResultType.POPULARITY_FEMALE: 1.0,
+            ResultType.GENDER_POPULARITY_RATIO: 1.0,
+            ResultType.UNDERWATCHED: 1/3,
+            ResultType.SCORE: score,
+            ResultType.SCORE_MALE: 5.0,
+            ResultType.SCORE_FEMALE: 3.0,
+            ResultType.GENDER_SCORE_DIFFERENCE: 2.0,
+            ResultType.SURPRISE: 1/3,
+            ResultType.DISAPPOINTMENT: 1/3,
+            ResultType.AGE: 25.0,
+        }
+
+    def test_preseason_results(self):
+        results = ResultsGenerator(self.preseason_survey, backend='database').generate_anime_results_data()
+        # Pre-season surveys take into account the expected scores of non-watchers as well
+        self.assertResultsAlmostEqual(results[self.anime.id], self.get_expected_results(score=3.0))
+
+    def test_postseason_results(self):
+        results = ResultsGenerator(self.postseason_survey, backend='database').generate_anime_results_data()
+        self.assertResultsAlmostEqual(results[self.anime.id], self.get_expected_results(score=4.0))
+
+    def test_unwatched_anime_results(self):
+        results = ResultsGenerator(self.preseason_survey, backend='database').generate_anime_results_data()
+        self.assertResultsAlmostEqual(results[self.unwatched_anime.id], {
+            ResultType.POPULARITY: 0.0,
+            ResultType.POPULARITY_MALE: 0.0,
+            ResultType.POPULARITY_FEMALE: 0.0,
+            ResultType.GENDER_POPULARITY_RATIO: None,
+            ResultType.UNDERWATCHED: None,
+            ResultType.SCORE: None,
+            ResultType.SCORE_MALE: None,
+            ResultType.SCORE_FEMALE: None,
+            ResultType.GENDER_SCORE_DIFFERENCE: None,
+            ResultType.SURPRISE: None,
+            ResultType.DISAPPOINTMENT: None,
+            ResultType.AGE: None,
+        })
+
+    def test_demographic_results(self):
+        url = '/api/survey/2020/%i/pre/results/demographics/' % Anime.AnimeSeason.WINTER
+        expected_results = [
+            # Male and female respondents: ages 20 and 30, scores 5 and 3, one is underwatched and one is surprised
+            ({'gender': ['M', 'F']}, 2, {
+                ResultType.POPULARITY: 1.0,
+                ResultType.UNDERWATCHED: 0.5,
+                ResultType.SCORE: 4.0,
+                ResultType.SURPRISE: 0.5,
+                ResultType.DISAPPOINTMENT: 0.0,
+                ResultType.AGE: 25.0,
+            }),
+            # Only the male respondent
+            ({'age': ['18-24']}, 1, {
+                ResultType.POPULARITY: 1.0,
+                ResultType.UNDERWATCHED: 0.0,
+                ResultType.SCORE: 5.0,
+                ResultType.SURPRISE: 1.0,
+                ResultType.DISAPPOINTMENT: 0.0,
+                ResultType.AGE: 20.0,
+            }),
+        ]
+        for query, expected_response_count, expected_anime_results in expected_results:
+            response_data = json.loads(self.client.get(url, query).content)
+            self.assertEqual(response_data['response_count'], expected_response_count)
+            self.assertResultsAlmostEqual(
+                {ResultType(int(resulttype)): value for resulttype, value in response_data['results'][str(self.anime.id)].items()},
+                expected_anime_results,
+            )
+
+    def test_numpy_backend(self):
+        for survey in [self.preseason_survey, self.postseason_survey]:
+            database_results = ResultsGenerator(survey, backend='database').generate_anime_results_data()
+            numpy_results = ResultsGenerator(survey, backend='numpy').generate_anime_results_data()
+
+            self.assertEqual(numpy_results, database_results)
+
+    def test_confidence_intervals(self):
+        bound_resulttypes = [ResultType.POPULARITY_LOWER_BOUND, ResultType.POPULARITY_UPPER_BOUND, ResultType.SCORE_LOWER_BOUND, ResultType.SCORE_UPPER_BOUND]
+        results = ResultsGenerator(self.postseason_survey).generate_anime_results_data()
+        self.assertFalse(set(bound_resulttypes) & results[self.anime.id].keys())
+
+        with self.settings(RESULTS_CONFIDENCE_INTERVALS=True):
+            results = ResultsGenerator(self.postseason_survey).generate_anime_results_data()
+            # The intervals are seeded with the survey's id, so they're the same every time
+            self.assertEqual(ResultsGenerator(self.postseason_survey).generate_anime_results_data(), results)
+
+        anime_results = results[self.anime.id]
+        self.assertLessEqual(anime_results[ResultType.POPULARITY_LOWER_BOUND], 3/4)
+        self.assertGreaterEqual(anime_results[ResultType.POPULARITY_UPPER_BOUND], 3/4)
+        self.assertLessEqual(anime_results[ResultType.SCORE_LOWER_BOUND], 4.0)
+        self.assertGreaterEqual(anime_results[ResultType.SCORE_UPPER_BOUND], 4.0)
+
+        # Nobody watched or scored the unwatched anime, so its popularity can only be 0 and its score is unknown
+        unwatched_anime_results = results[self.unwatched_anime.id]
+        self.assertEqual([unwatched_anime_results[resulttype] for resulttype in bound_resulttypes], [0.0, 0.0, None, None])
+
+    def test_comparison(self):
+        comparison_data = json.loads(self.client.get('/api/survey/2020/%i/comparison/' % Anime.AnimeSeason.WINTER).content)['comparison']
+        self.assertEqual(comparison_data[str(self.anime.id)], {
+            'preseason_score': 3.0,
+            'postseason_score': 4.0,
+            'score_difference': 1.0,
+            'preseason_score_rank': 1,
+            'postseason_score_rank': 1,
+            'preseason_popularity': 0.75,
+            'postseason_popularity': 0.75,
+            'popularity_difference': 0.0,
+            'preseason_popularity_rank': 1,
+            'postseason_popularity_rank': 1,
+        })
+        # Nobody scored the unwatched anime, so it only has a popularity rank
+        self.assertEqual(comparison_data[str(self.unwatched_anime.id)], {
+            'preseason_score': None,
+            'postseason_score': None,
+            'score_difference': None,
+            'preseason_score_rank': None,
+            'postseason_score_rank': None,
+            'preseason_popularity': 0.0,
+            'postseason_popularity': 0.0,
+            'popularity_difference': 0.0,
+            'preseason_popularity_rank': 2,
+            'postseason_popularity_rank': 2,
+        })
+
+
+
+class BootstrapConfidenceIntervalsTestCase(TestCase):
+    def get_confidence_intervals(self, seed: int) -> dict[int, dict[ResultType, Optional[float]]]:
+        return get_bootstrap_confidence_intervals(
+            anime_ids=[1, 2, 3],
+            watcher_counts=[30, 0, 0],
+            response_counts=[100, 0, 50],
+            score_counts=[[1, 2, 3, 4, 5], [0, 0, 0, 0, 0], [0, 0, 0, 0, 0]],
+            seed=seed,
+        )
+
+    def test_bounds_contain_estimate(self):
+        bounds = self.get_confidence_intervals(seed=1)[1]
+        self.assertLess(bounds[ResultType.POPULARITY_LOWER_BOUND], 0.3)
+        self.assertGreater(bounds[ResultType.POPULARITY_UPPER_BOUND], 0.3)
+        # (1*1 + 2*2 + 3*3 + 4*4 + 5*5) / 15
+        self.assertLess(bounds[ResultType.SCORE_LOWER_BOUND], 55/15)
+        self.assertGreater(bounds[ResultType.SCORE_UPPER_BOUND], 55/15)
+        for bound in bounds.values():
+            self.assertIsInstance(bound, float)
+
+    def test_empty_anime(self):
+        confidence_intervals = self.get_confidence_intervals(seed=1)
+        # Anime without responses have no popularity, anime without scores have no score
+        self.assertEqual(set(confidence_intervals[2].values()), {None})
+        self.assertEqual(confidence_intervals[3], {
+            ResultType.POPULARITY_LOWER_BOUND: 0.0,
+            ResultType.POPULARITY_UPPER_BOUND: 0.0,
+            ResultType.SCORE_LOWER_BOUND: None,
+            ResultType.SCORE_UPPER_BOUND: None,
+        })
+
+    def test_seeded(self):
+        self.assertEqual(self.get_confidence_intervals(seed=1), self.get_confidence_intervals(seed=1))
+        self.assertNotEqual(self.get_confidence_intervals(seed=1)[1], self.get_confidence_intervals(seed=2)[1])
+
+
+
+@override_settings(CACHES=TEST_CACHES, CACHE_LOCK_DIR=tempfile.mkdtemp(), RESULTS_CONFIDENCE_INTERVALS=False)
+class ResultsCountersTestCase(TestCase):
+    """Checks that the results of ongoing surveys, which come from the live counters, equal the results generated from the responses."""
+    def setUp(self):
+        now = timezone.now()
+        self.survey = Survey.objects.create(year=2020, season=Anime.AnimeSeason.WINTER, is_preseason=True, opening_time=now - timedelta(days=1), closing_time=now + timedelta(days=5))
+        self.anime_list = [
+            Anime.objects.create(
+                anime_type=Anime.AnimeType.TV_SERIES,
+                start_year=2020, start_season=Anime.AnimeSeason.WINTER,
+                end_year=2020, end_season=Anime.AnimeSeason.SPRING,
+            ) for _ in range(3)
+        ]
+        self.url = '/api/survey/2020/%i/pre/' % Anime.AnimeSeason.WINTER
+
+    def put_form(self, username: str, gender: str, anime_response_data_dict: dict[int, dict]):
+        self.client.force_login(User.objects.get_or_create(username=username)[0])
+        response = self.client.put(self.url, json.dumps({
+            'response_data': {'age': 20, 'gender': gender},
+            'anime_response_data_dict': {str(anime_id): anime_response_data for anime_id, anime_response_data in anime_response_data_dict.items()},
+            'is_response_linked_to_user': True,
+        }), content_type='application/json')
+        self.assertLess(response.status_code, 400, response.content)
+
+    def assertCountersMatchResponses(self):
+        results_generator = ResultsGenerator(self.survey)
+        self.assertEqual(results_generator.get_anime_results_data(), results_generator.generate_anime_results_data())
+
+    def test_submissions(self):
+        def anime_response_data(score: Optional[int], watching: bool = True) -> dict:
+            return {'score': score, 'watching': watching, 'underwatched': False, 'expectations': AnimeResponse.Expectations.SURPRISE}
+
+        self.put_form('first', Response.Gender.MALE, {anime.id: anime_response_data(4) for anime in self.anime_list})
+        self.put_form('second', Response.Gender.FEMALE, {self.anime_list[0].id: anime_response_data(2, watching=False), self.anime_list[1].id: anime_response_data(None)})
+        self.assertCountersMatchResponses()
+
+        # Edited submission, with a different gender and scores
+        self.put_form('first', Response.Gender.FEMALE, {anime.id: anime_response_data(1) for anime in self.anime_list})
+        self.assertCountersMatchResponses()
+
+        # Submission from which anime were removed
+        self.put_form('first', Response.Gender.FEMALE, {self.anime_list[2].id: anime_response_data(5)})
+        self.assertCountersMatchResponses()
+
+    def test_missing_counters_rebuilt(self):
+        response = Response.objects.create(survey=self.survey, age=30, gender=Response.Gender.MALE)
+        AnimeResponse.objects.create(response=response, anime=self.anime_list[0], watching=True, score=3, underwatched=False)
+        self.assertCountersMatchResponses()
+
+        # Responses that were submitted before the counters existed are included when a new response updates the counters
+        SurveyAnimeCounter.objects.all().delete()
+        self.put_form('first', Response.Gender.FEMALE, {self.anime_list[0].id: {'score': 5, 'watching': True, 'underwatched': False, 'expectations': None}})
+        self.assertCountersMatchResponses()
+
+    def test_response_admin(self):
+        self.put_form('first', Response.Gender.MALE, {anime.id: {'score': 4, 'watching': True, 'underwatched': False, 'expectations': None} for anime in self.anime_list})
+        response = Response.objects.get(survey=self.survey)
+
+        ResponseAdmin(Response, admin.site).delete_model(None, response)
+        self.assertCountersMatchResponses()
+        self.assertFalse(SurveyAnimeCounter.objects.filter(survey=self.survey).exists())
+
+
+
+class AdjustedResponseCountTestCase(TestCase):
+    RESPONSE_COUNT = 100
+
+    def get_adjusted_response_count(self, additions_removals: list[tuple[bool, int]]) -> int:
+        return get_adjusted_response_count([
+            SurveyAdditionRemoval(is_addition=is_addition, response_count=response_count)
+            for is_addition, response_count in additions_removals
+        ], self.RESPONSE_COUNT)
+
+    def test_no_adjustment(self):
+        self.assertEqual(self.get_adjusted_response_count([]), 100)
+
+    def test_addition(self):
+        # Added after 30 responses
+        self.assertEqual(self.get_adjusted_response_count([(True, 30)]), 70)
+
+    def test_removal_and_addition(self):
+        # Removed after 20 responses and added back after 50 responses
+        self.assertEqual(self.get_adjusted_response_count([(False, 20), (True, 50)]), 70)
+
+    def test_trailing_removal(self):
+        # Added after 10 responses and removed after 60 responses
+        self.assertEqual(self.get_adjusted_response_count([(True, 10), (False, 60)]), 50)
+
+    def test_adjusted_response_counts(self):
+        now = timezone.now()
+        survey = Survey.objects.create(year=2020, season=Anime.AnimeSeason.WINTER, is_preseason=True, opening_time=now - timedelta(days=10), closing_time=now - timedelta(days=5))
+        added_anime, readded_anime, _ = [Anime.objects.create(anime_type=Anime.AnimeType.TV_SERIES, start_year=2020, start_season=Anime.AnimeSeason.WINTER) for _ in range(3)]
+        SurveyAdditionRemoval.objects.create(survey=survey, anime=readded_anime, is_addition=False, response_count=20)
+        SurveyAdditionRemoval.objects.create(survey=survey, anime=added_anime, is_addition=True, response_count=30)
+        SurveyAdditionRemoval.objects.create(survey=survey, anime=readded_anime, is_addition=True, response_count=50)
+
+        # Additions/removals are grouped per anime in chronological order, anime that were never added/removed aren't adjusted
+        self.assertEqual(get_adjusted_response_counts(survey, self.RESPONSE_COUNT), {added_anime.id: 70, readded_anime.id: 70})
+
+
+
+@override_settings(CACHES=TEST_CACHES, CACHE_LOCK_DIR=tempfile.mkdtemp())
+class AnimeCacheTestCase(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        caches['long'].clear()
+
+        now = timezone.now()
+        self.winter_survey = Survey.objects.create(year=2020, season=Anime.AnimeSeason.WINTER, is_preseason=True, opening_time=now - timedelta(days=100), closing_time=now - timedelta(days=90))
+        self.spring_survey = Survey.objects.create(year=2020, season=Anime.AnimeSeason.SPRING, is_preseason=True, opening_time=now - timedelta(days=10), closing_time=now - timedelta(days=5))
+        self.ongoing_survey = Survey.objects.create(year=2020, season=Anime.AnimeSeason.SUMMER, is_preseason=True, opening_time=now - timedelta(days=1), closing_time=now + timedelta(days=5))
+        self.winter_anime = Anime.objects.create(anime_type=Anime.AnimeType.TV_SERIES, start_year=2020, start_season=Anime.AnimeSeason.WINTER, end_year=2020, end_season=Anime.AnimeSeason.WINTER)
+        self.summer_anime = Anime.objects.create(anime_type=Anime.AnimeType.TV_SERIES, start_year=2020, start_season=Anime.AnimeSeason.SUMMER)
+
+        for survey in [self.winter_survey, self.spring_survey]:
+            Response.objects.create(survey=survey, age=20, gender=Response.Gender.MALE)
+            self.client.get(self.get_results_url(survey))
+
+    def get_results_url(self, survey: Survey) -> str:
+        return '/api/survey/2020/%i/pre/results/' % survey.season
+
+    def is_results_response_cached(self, survey: Survey) -> bool:
+        return caches['long'].get(get_results_response_cache_key(survey.year, survey.season, survey.is_preseason), version=2) is not None
+
+    def test_get_surveys_with_anime(self):
+        self.assertEqual(get_surveys_with_anime(self.winter_anime), [self.winter_survey])
+        self.assertEqual(get_surveys_with_anime(self.summer_anime), [self.ongoing_survey])
+
+    def test_only_surveys_with_anime_cleared(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            AnimeName.objects.create(anime=self.winter_anime, anime_name_type=AnimeName.AnimeNameType.ENGLISH_NAME, name='Renamed anime')
+        self.assertFalse(self.is_results_response_cached(self.winter_survey))
+        self.assertTrue(self.is_results_response_cached(self.spring_survey))
+
+    def test_survey_change_cleared(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.winter_survey.save()
+        self.assertFalse(self.is_results_response_cached(self.winter_survey))
+        self.assertTrue(self.is_results_response_cached(self.spring_survey))
+
+    def test_deleted_anime_results_cleared(self):
+        response = Response.objects.get(survey=self.winter_survey)
+        AnimeResponse.objects.create(response=response, anime=self.winter_anime, watching=True, score=4, underwatched=False)
+        ResultsGenerator(self.winter_survey).clear_anime_results_data()
+        self.assertEqual(self.client.get('/api/index/').status_code, 200)
+
+        anime_id = self.winter_anime.id
+        with self.captureOnCommitCallbacks(execute=True):
+            self.winter_anime.delete()
+        self.assertNotIn(anime_id, ResultsGenerator(self.winter_survey).get_anime_results_data())
+        self.assertEqual(self.client.get('/api/index/').status_code, 200)
+
+    def test_deleted_anime_queryset_cleared(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Anime.objects.filter(id=self.winter_anime.id).delete()
+        self.assertFalse(self.is_results_response_cached(self.winter_survey))
+        self.assertTrue(self.is_results_response_cached(self.spring_survey))
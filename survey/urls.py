@@ -1,5 +1,8 @@
 from django.urls import path
+from survey.views.api.anime_history import AnimeHistoryApi
 from survey.views.api.index import IndexApi
+from survey.views.api.survey_comparison import SurveyComparisonApi
+from survey.views.api.survey_demographic_results import SurveyDemographicResultsApi
 from survey.views.api.survey_form import SurveyFormApi
 from survey.views.api.survey_missing_anime import SurveyMissingAnimeApi
 from survey.views.api.survey_results import SurveyResultsApi
@@ -10,7 +13,10 @@ app_name = 'survey'
 urlpatterns = [
     path('index/', IndexApi.as_view()),
     path('user/', UserApi.as_view()),
+    path('anime/<int:anime_id>/history/', AnimeHistoryApi.as_view()),
+    path('survey/<int:year>/<int:season>/comparison/', SurveyComparisonApi.as_view()),
     path('survey/<int:year>/<int:season>/<pre_or_post>/', SurveyFormApi.as_view()),
     path('survey/<int:year>/<int:season>/<pre_or_post>/missinganime/', SurveyMissingAnimeApi.as_view()),
     path('survey/<int:year>/<int:season>/<pre_or_post>/results/', SurveyResultsApi.as_view()),
+    path('survey/<int:year>/<int:season>/<pre_or_post>/results/demographics/', SurveyDemographicResultsApi.as_view()),
 ]
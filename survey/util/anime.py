@@ -2,8 +2,8 @@ from django.conf import settings
 from django.db.models import Q, F
 from django.db.models.manager import BaseManager
 from survey.models import Anime, AnimeName
-from survey.util.data import ImageViewModel
-from typing import Optional
+from survey.util.data import AnimeViewModel, ImageViewModel
+from typing import Iterable, Optional
 
 
 anime_series_filter = Q(anime_type=Anime.AnimeType.TV_SERIES) | Q(anime_type=Anime.AnimeType.ONA_SERIES) | Q(anime_type=Anime.AnimeType.BULK_RELEASE)
@@ -55,6 +55,24 @@ def calc_season_difference(year_season_a: int, year_season_b: int) -> int:
     return diff * 4 / 10
 
 
+def get_anime_view_models(anime_ids: Iterable[int]) -> dict[int, AnimeViewModel]:
+    """Gets the view models of the given anime, using a constant amount of queries regardless of the amount of anime.
+
+    Parameters
+    ----------
+    anime_ids : Iterable[int]
+        The ids of the anime, or an anime queryset.
+
+    Returns
+    -------
+    {anime_id: AnimeViewModel}
+        A dict containing the view model of each anime that exists.
+    """
+    # Load the names and images of all anime at once, instead of two queries per anime
+    anime_queryset = Anime.objects.filter(id__in=anime_ids).prefetch_related('animename_set', 'image_set')
+    return {anime.id: AnimeViewModel.from_model(anime) for anime in anime_queryset}
+
+
 def get_name_list(anime: Anime, official_names_only: bool = True) -> list[str]:
     animename_queryset = anime.animename_set.filter(official=official_names_only)
     japanese_names = animename_queryset.filter(anime_name_type=AnimeName.AnimeNameType.JAPANESE_NAME)
@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.core.cache import BaseCache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+import os
+import time
+from typing import Any, Callable, Iterable, Optional
+
+
+# gunicorn kills workers that take longer than its worker timeout (30 seconds by default), so processes only wait well below that,
+# and a lock that's older than the timeout was left behind by a killed worker
+LOCK_STALE_SECONDS = 45
+LOCK_WAIT_SECONDS = 10
+LOCK_POLL_INTERVAL_SECONDS = 0.25
+
+# Suffix of the key under which a copy of the last generated value is kept, to be served while the value is regenerated
+PREVIOUS_VALUE_KEY_SUFFIX = '_previous'
+
+
+class CacheGenerationTimeout(Exception):
+    """Raised when another process is still generating a cached value after waiting for it, and there is no previous value to use instead."""
+    pass
+
+
+def get_or_set_single_flight(cache: BaseCache, key: str, default: Callable[[], Any], version: Optional[int] = None, timeout: Optional[int] = DEFAULT_TIMEOUT) -> Any:
+    """Works like cache.get_or_set, but ensures that only one process at a time calls default for the same key.
+
+    Processes that fail to acquire the lock use the previously generated value if the value expired, otherwise they wait for the process holding the lock to set the value. If that process fails they call default
+    themselves, if it takes too long they raise CacheGenerationTimeout. The lock is a lock file in settings.CACHE_LOCK_DIR, so it works
+    across gunicorn workers.
+
+    Parameters
+    ----------
+    cache : BaseCache
+        The cache to get the value from or to set the value in.
+    key : str
+        The cache key.
+    default : Callable[[], Any]
+        Function that generates the value if it's not in the cache. Should not return None.
+    version : int, optional
+        The cache key version.
+    timeout : int, optional
+        The cache timeout of the value.
+
+    Returns
+    -------
+    Any
+        The cached, previous or generated value.
+
+    Raises
+    ------
+    CacheGenerationTimeout
+        If another process is still generating the value after LOCK_WAIT_SECONDS, and there is no previous value.
+    """
+    value = cache.get(key, version=version)
+    if value is not None:
+        return value
+
+    lock_path = os.path.join(settings.CACHE_LOCK_DIR, '%s.%s.lock' % (key, version))
+    if try_acquire_lock(lock_path):
+        try:
+            # Another process may have set the value before the lock was acquired
+            value = cache.get(key, version=version)
+            if value is None:
+                value = set_generated_value(cache, key, default(), version, timeout)
+            return value
+        finally:
+            release_lock(lock_path)
+
+    previous_value = cache.get(key + PREVIOUS_VALUE_KEY_SUFFIX, version=version)
+    if previous_value is not None:
+        return previous_value
+
+    wait_deadline = time.monotonic() + LOCK_WAIT_SECONDS
+    while time.monotonic() < wait_deadline:
+        time.sleep(LOCK_POLL_INTERVAL_SECONDS)
+        value = cache.get(key, version=version)
+        if value is not None:
+            return value
+
+        # The lock was released without setting the value, so the other process must have failed
+        if not os.path.exists(lock_path):
+            return set_generated_value(cache, key, default(), version, timeout)
+
+    # Generating it as well would only make both processes slower, the client can retry once the value is cached
+    raise CacheGenerationTimeout('The value of cache key "%s" is still being generated' % key)
+
+def set_generated_value(cache: BaseCache, key: str, value: Any, version: Optional[int], timeout: Optional[int]) -> Any:
+    """Sets a value generated by get_or_set_single_flight, along with a copy that outlives it to be used while it's regenerated."""
+    cache.set(key, value, timeout=timeout, version=version)
+    cache.set(key + PREVIOUS_VALUE_KEY_SUFFIX, value, timeout=None, version=version)
+    return value
+
+
+def delete_single_flight(cache: BaseCache, keys: Iterable[str], version: Optional[int] = None):
+    """Removes values set by get_or_set_single_flight along with their previous values, e.g. because the data they're generated from changed."""
+    keys = list(keys)
+    cache.delete_many(keys + [key + PREVIOUS_VALUE_KEY_SUFFIX for key in keys], version=version)
+
+
+def try_acquire_lock(lock_path: str) -> bool:
+    """Tries to create the lock file, returns whether it was created. Lock files older than LOCK_STALE_SECONDS are considered abandoned and replaced."""
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    for _ in range(2):
+        try:
+            os.close(os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) < LOCK_STALE_SECONDS:
+                    return False
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+    return False
+
+
+def release_lock(lock_path: str):
+    try:
+        os.remove(lock_path)
+    except FileNotFoundError:
+        pass
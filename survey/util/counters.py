@@ -0,0 +1,185 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+from survey.models import AnimeResponse, Response, Survey, SurveyAnimeCounter
+from typing import Iterable, Optional
+
+
+COUNTER_FIELDS = [
+    'watcher_count',
+    'male_watcher_count',
+    'female_watcher_count',
+    'underwatched_count',
+    'surprise_count',
+    'disappointment_count',
+    'score_count',
+    'score_sum',
+    'male_score_count',
+    'male_score_sum',
+    'female_score_count',
+    'female_score_sum',
+    'age_count',
+    'age_sum',
+]
+
+
+def get_counter_values(anime_responses: Iterable[AnimeResponse], gender: Optional[str], age: Optional[int], is_preseason: bool) -> dict[int, dict[str, int]]:
+    """Gets how much the anime responses of a single response contribute to each counter, per anime.
+
+    Parameters
+    ----------
+    anime_responses : Iterable[AnimeResponse]
+        The anime responses belonging to a single response.
+    gender : str, optional
+        The gender of the response.
+    age : int, optional
+        The age of the response.
+    is_preseason : bool
+        Whether the survey is a pre-season survey.
+
+    Returns
+    -------
+    {anime_id: {str: int}}
+        A dict where each anime has an associated dict of counter values.
+    """
+    is_male = gender == Response.Gender.MALE
+    is_female = gender == Response.Gender.FEMALE
+
+    counter_values_dict = {}
+    for anime_response in anime_responses:
+        counter_values = dict.fromkeys(COUNTER_FIELDS, 0)
+
+        if anime_response.watching:
+            counter_values['watcher_count'] = 1
+            counter_values['male_watcher_count'] = int(is_male)
+            counter_values['female_watcher_count'] = int(is_female)
+            counter_values['underwatched_count'] = int(anime_response.underwatched)
+            counter_values['surprise_count'] = int(anime_response.expectations == AnimeResponse.Expectations.SURPRISE)
+            counter_values['disappointment_count'] = int(anime_response.expectations == AnimeResponse.Expectations.DISAPPOINTMENT)
+            if age is not None:
+                counter_values['age_count'] = 1
+                counter_values['age_sum'] = age
+
+        # Pre-season surveys take into account everyone's expected score, post-season surveys only take into account watchers' scores
+        if anime_response.score is not None and (is_preseason or anime_response.watching):
+            counter_values['score_count'] = 1
+            counter_values['score_sum'] = anime_response.score
+            if is_male:
+                counter_values['male_score_count'] = 1
+                counter_values['male_score_sum'] = anime_response.score
+            elif is_female:
+                counter_values['female_score_count'] = 1
+                counter_values['female_score_sum'] = anime_response.score
+
+        counter_values_dict[anime_response.anime_id] = counter_values
+    return counter_values_dict
+
+
+def update_counters(survey: Survey, previous_counter_values_dict: dict[int, dict[str, int]], counter_values_dict: dict[int, dict[str, int]]):
+    """Applies the difference between a response's previous and new counter values (see get_counter_values) to the survey's counters."""
+    empty_counter_values = dict.fromkeys(COUNTER_FIELDS, 0)
+
+    counter_deltas_dict: dict[int, dict[str, int]] = {}
+    for anime_id in previous_counter_values_dict.keys() | counter_values_dict.keys():
+        previous_counter_values = previous_counter_values_dict.get(anime_id, empty_counter_values)
+        counter_values = counter_values_dict.get(anime_id, empty_counter_values)
+
+        counter_deltas = {
+            field: counter_values[field] - previous_counter_values[field]
+            for field in COUNTER_FIELDS if counter_values[field] != previous_counter_values[field]
+        }
+        if counter_deltas:
+            counter_deltas_dict[anime_id] = counter_deltas
+
+    if not counter_deltas_dict:
+        return
+
+    with transaction.atomic():
+        SurveyAnimeCounter.objects.bulk_create([
+            SurveyAnimeCounter(survey=survey, anime_id=anime_id) for anime_id in counter_deltas_dict.keys()
+        ], ignore_conflicts=True)
+
+        # Update using F-expressions so that concurrent submissions don't overwrite each other's changes,
+        # and in a single query so that the amount of queries doesn't grow with the amount of anime
+        changed_fields = {field for counter_deltas in counter_deltas_dict.values() for field in counter_deltas.keys()}
+        SurveyAnimeCounter.objects.filter(survey=survey, anime_id__in=counter_deltas_dict.keys()).update(**{
+            field: F(field) + Case(
+                *[When(anime_id=anime_id, then=Value(counter_deltas[field])) for anime_id, counter_deltas in counter_deltas_dict.items() if field in counter_deltas],
+                default=Value(0),
+                output_field=IntegerField(),
+            ) for field in changed_fields
+        })
+
+
+def rebuild_counters(survey: Survey) -> int:
+    """Recalculates all of the survey's counters from its anime responses, returns the amount of anime counters."""
+    watching_filter = Q(watching=True)
+    male_filter = Q(response__gender=Response.Gender.MALE)
+    female_filter = Q(response__gender=Response.Gender.FEMALE)
+    score_filter = Q(score__isnull=False) if survey.is_preseason else Q(score__isnull=False) & watching_filter
+    age_filter = watching_filter & Q(response__age__isnull=False)
+
+    counter_rows = AnimeResponse.objects.filter(
+        response__survey=survey,
+    ).values('anime_id').annotate(
+        watcher_count=Count('id', filter=watching_filter),
+        male_watcher_count=Count('id', filter=watching_filter & male_filter),
+        female_watcher_count=Count('id', filter=watching_filter & female_filter),
+        underwatched_count=Count('id', filter=watching_filter & Q(underwatched=True)),
+        surprise_count=Count('id', filter=watching_filter & Q(expectations=AnimeResponse.Expectations.SURPRISE)),
+        disappointment_count=Count('id', filter=watching_filter & Q(expectations=AnimeResponse.Expectations.DISAPPOINTMENT)),
+        score_count=Count('id', filter=score_filter),
+        score_sum=Sum('score', filter=score_filter),
+        male_score_count=Count('id', filter=score_filter & male_filter),
+        male_score_sum=Sum('score', filter=score_filter & male_filter),
+        female_score_count=Count('id', filter=score_filter & female_filter),
+        female_score_sum=Sum('score', filter=score_filter & female_filter),
+        age_count=Count('id', filter=age_filter),
+        age_sum=Sum('response__age', filter=age_filter),
+    ).order_by()
+
+    # Sums become None when there are no values to sum
+    counters = [
+        SurveyAnimeCounter(survey=survey, **{field: counter_row[field] or 0 for field in ['anime_id'] + COUNTER_FIELDS})
+        for counter_row in counter_rows
+    ]
+
+    with transaction.atomic():
+        SurveyAnimeCounter.objects.filter(survey=survey).delete()
+        SurveyAnimeCounter.objects.bulk_create(counters)
+    return len(counters)
+
+
+def ensure_counters(survey: Survey) -> bool:
+    """Rebuilds the survey's counters if it has responses but no counters, e.g. because it was already ongoing before counters were maintained. Returns whether they were rebuilt."""
+    if SurveyAnimeCounter.objects.filter(survey=survey).exists() or not Response.objects.filter(survey=survey).exists():
+        return False
+    rebuild_counters(survey)
+    return True
+
+
+def get_anime_aggregates_from_counters(survey: Survey) -> dict[int, dict[str, Optional[float]]]:
+    """Gets the aggregates of each anime of a survey from the survey's counters, in the same format as ResultsGenerator's database aggregates.
+
+    The counters are rebuilt first if the survey doesn't have any yet, see ensure_counters.
+    """
+    def div_or_none(a: int, b: int) -> Optional[float]:
+        return a / b if b != 0 else None
+
+    counter_list = list(SurveyAnimeCounter.objects.filter(survey=survey))
+    if not counter_list and ensure_counters(survey):
+        counter_list = list(SurveyAnimeCounter.objects.filter(survey=survey))
+
+    return {
+        counter.anime_id: {
+            'watcher_count':        counter.watcher_count,
+            'male_watcher_count':   counter.male_watcher_count,
+            'female_watcher_count': counter.female_watcher_count,
+            'underwatched_count':   counter.underwatched_count,
+            'surprise_count':       counter.surprise_count,
+            'disappointment_count': counter.disappointment_count,
+            'average_score':        div_or_none(counter.score_sum, counter.score_count),
+            'male_average_score':   div_or_none(counter.male_score_sum, counter.male_score_count),
+            'female_average_score': div_or_none(counter.female_score_sum, counter.female_score_count),
+            'average_age':          div_or_none(counter.age_sum, counter.age_count),
+        } for counter in counter_list
+    }
@@ -6,6 +6,7 @@ from django.utils.functional import classproperty
 from enum import Enum
 from json import JSONEncoder
 from survey.models import Anime, AnimeName, Image, Survey
+from survey.util.timing import measure_encode
 from typing import Any, Callable, Optional, Tuple, Type
 
 
@@ -16,6 +17,10 @@ def json_encoder_factory(fields_per_model: dict[Type[Model], list[str]] = {}, ex
 
             self.fields_per_model = fields_per_model
             self.excluded_fields_per_model = excluded_fields_per_model
+
+        def encode(self, o: Any) -> str:
+            with measure_encode():
+                return super().encode(o)
             
         def default(self, o: Any) -> Any:
             if isinstance(o, ViewModelBase):
@@ -138,10 +143,14 @@ class ResultType(int, Enum):
     POPULARITY_MALE             =  2 #"Popularity (Male)"
     POPULARITY_FEMALE           =  3 #"Popularity (Female)"
     GENDER_POPULARITY_RATIO     =  4 #"Gender Ratio (♂:♀)"
+    POPULARITY_LOWER_BOUND      =  5 #"Popularity (95% CI Lower Bound)"
+    POPULARITY_UPPER_BOUND      =  6 #"Popularity (95% CI Upper Bound)"
     SCORE                       = 11 #"Score"
     SCORE_MALE                  = 12 #"Score (Male)"
     SCORE_FEMALE                = 13 #"Score (Female)"
     GENDER_SCORE_DIFFERENCE     = 14 #"Gender Score Difference (♂-♀)"
+    SCORE_LOWER_BOUND           = 15 #"Score (95% CI Lower Bound)"
+    SCORE_UPPER_BOUND           = 16 #"Score (95% CI Upper Bound)"
     UNDERWATCHED                = 21 #"Underwatched"
     SURPRISE                    = 22 #"Surprise"
     DISAPPOINTMENT              = 23 #"Disappointment"
@@ -1,7 +1,16 @@
 from http import HTTPStatus
 from django.http import HttpResponse, JsonResponse
+from django.http.request import HttpRequest
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+import gzip
+from hashlib import sha256
 from json import JSONEncoder
-from typing import Optional, Type, Union
+from typing import Any, Optional, Type, Union
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 class JsonErrorResponse(JsonResponse):
     def __init__(self, data: Union[str, list, dict], status: Union[HTTPStatus, int], encoder: Type[JSONEncoder] = None, safe: bool = True, *args, **kwargs) -> None:
@@ -17,3 +26,71 @@ class JsonErrorResponse(JsonResponse):
 class HttpEmptyErrorResponse(HttpResponse):
     def __init__(self, status: Union[HTTPStatus, int], *args, **kwargs) -> None:
         super().__init__({}, status=status, *args, **kwargs)
+
+
+def get_etag(body: bytes) -> str:
+    """Gets a strong ETag for the given response body."""
+    return '"%s"' % sha256(body).hexdigest()
+
+def get_preserialized_json_payload(body: bytes) -> dict[str, Any]:
+    """Prepares an already serialized JSON body to be cached and returned by get_preserialized_json_response.
+
+    The body is compressed here, once, so that responses never have to be compressed per request.
+    Brotli is only used if the brotli package is installed.
+
+    Returns
+    -------
+    dict
+        A dict with keys 'body' (bytes), 'etag' (str) and 'encodings' ({content_encoding: bytes}),
+        where 'encodings' only contains the compressed bodies that are smaller than the uncompressed body.
+    """
+    encodings = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        encodings['br'] = brotli.compress(body, quality=11)
+
+    return {
+        'body': body,
+        'etag': get_etag(body),
+        'encodings': {encoding: compressed_body for encoding, compressed_body in encodings.items() if len(compressed_body) < len(body)},
+    }
+
+def get_preserialized_json_response(request: HttpRequest, payload: dict[str, Any]) -> HttpResponse:
+    """Creates a response from a payload created by get_preserialized_json_payload, or a 304 Not Modified response if the client already has this body.
+
+    The best compressed body accepted by the client is returned. Clients have to revalidate the response on every request,
+    and it's not stored by the cache middleware, which would ignore the client's If-None-Match header.
+    """
+    accepted_encodings = get_accepted_encodings(request.headers.get('Accept-Encoding', ''))
+    content_encoding = next((encoding for encoding in ['br', 'gzip'] if (encoding in accepted_encodings or '*' in accepted_encodings) and encoding in payload['encodings']), None)
+
+    if content_encoding is None:
+        response = HttpResponse(payload['body'], content_type='application/json')
+        etag = payload['etag']
+    else:
+        response = HttpResponse(payload['encodings'][content_encoding], content_type='application/json')
+        response['Content-Encoding'] = content_encoding
+        # Each encoding is a different representation, which needs its own strong ETag
+        etag = payload['etag'][:-1] + '-' + content_encoding + '"'
+
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept-Encoding'])
+    patch_cache_control(response, max_age=0)
+    return get_conditional_response(request, etag=etag, response=response)
+
+def get_accepted_encodings(accept_encoding: str) -> set[str]:
+    """Gets the content codings in an Accept-Encoding header that are not refused with q=0."""
+    accepted_encodings = set()
+    for coding in accept_encoding.split(','):
+        coding_name, *parameters = [part.strip() for part in coding.split(';')]
+        quality = 1.0
+        for parameter in parameters:
+            parameter_name, _, parameter_value = parameter.partition('=')
+            if parameter_name.strip().lower() == 'q':
+                try:
+                    quality = float(parameter_value)
+                except ValueError:
+                    pass
+
+        if coding_name and quality > 0:
+            accepted_encodings.add(coding_name.lower())
+    return accepted_encodings
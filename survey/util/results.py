@@ -1,27 +1,80 @@
+from collections import OrderedDict
+from django.conf import settings
 from django.core.cache import caches
-from django.db.models import Avg
+from django.db.models import Avg, Case, CharField, Count, Q, Sum, Value, When
+from django.utils import timezone
 import math
-from survey.models import AnimeResponse, Response, Survey, SurveyAdditionRemoval
+from survey.models import AnimeResponse, Response, Survey, SurveyAdditionRemoval, SurveyAnimeResult
+from survey.util.cache import delete_single_flight, get_or_set_single_flight
+from survey.util.counters import get_anime_aggregates_from_counters
 from survey.util.data import ResultType
-from survey.util.survey import get_survey_anime, get_survey_cache_timeout
+from survey.util.snapshots import delete_snapshot, get_index_snapshot_path, get_results_snapshot_path
+from survey.util.survey import clear_cached_survey_form_catalogues, clear_cached_survey_image_ids, get_survey_anime, get_survey_cache_timeout
+from typing import Iterable, Optional
+
+
+# Age bands that demographic results can be filtered on, with their inclusive age ranges
+AGE_BANDS: dict[str, tuple[int, int]] = {
+    '5-17':  ( 5, 17),
+    '18-24': (18, 24),
+    '25-29': (25, 29),
+    '30-39': (30, 39),
+    '40-80': (40, 80),
+}
+
+# Values of each cell of the demographic cube (see ResultsGenerator.get_demographic_cube)
+DEMOGRAPHIC_CUBE_FIELDS = [
+    'watcher_count',
+    'underwatched_count',
+    'surprise_count',
+    'disappointment_count',
+    'score_count',
+    'score_sum',
+    'age_count',
+    'age_sum',
+]
+
+# Aggregates of an anime without any responses
+EMPTY_ANIME_AGGREGATES = {
+    'watcher_count': 0,
+    'male_watcher_count': 0,
+    'female_watcher_count': 0,
+    'underwatched_count': 0,
+    'surprise_count': 0,
+    'disappointment_count': 0,
+    'average_score': None,
+    'male_average_score': None,
+    'female_average_score': None,
+    'average_age': None,
+}
+
+# Formats the results response can be requested in, see SurveyResultsApi
+RESULTS_RESPONSE_FORMATS = ['default', 'columnar']
+
+# Cache key of the serialized index response of all surveys
+INDEX_RESPONSE_CACHE_KEY = 'index_response'
 
 
 class ResultsGenerator:
     """Class for generating survey results."""
     survey: Survey
+    backend: str
 
-    def __init__(self, survey: Survey):
+    def __init__(self, survey: Survey, backend: Optional[str] = None):
         """Creates a survey results generator.
 
         Parameters
         ----------
         survey : Survey
             The survey for which results have to be generated.
+        backend : str, optional
+            The backend used to aggregate anime responses, either 'database' or 'numpy'. Defaults to settings.RESULTS_BACKEND.
         """
         self.survey = survey
+        self.backend = backend or settings.RESULTS_BACKEND
 
     def get_anime_results_data(self) -> dict[int, dict[ResultType, float]]:
-        """Obtains the results for the survey provided when initializing, either from the cache or generated from database data.
+        """Obtains the results for the survey provided when initializing, either from the cache, from the live counters if the survey is not finished yet, or generated from database data.
 
         Returns
         -------
@@ -29,99 +82,534 @@ class ResultsGenerator:
             A dict where each anime has an associated dict of result values.
         """
         if self.survey.state != Survey.State.FINISHED:
-            return self.__get_anime_results_data_internal()
+            # Results of surveys that are still ongoing change with every response, use the live counters instead of aggregating all responses
+            return self.__get_anime_results_data_from_aggregates(get_anime_aggregates_from_counters(self.survey))
+        else:
+            cache_timeout = get_survey_cache_timeout(self.survey)
+            # Only let one process generate the results at a time when they're not cached, e.g. when the cache expires under load
+            return get_or_set_single_flight(caches['long'], 'survey_results_%i' % self.survey.id, self.__get_finished_anime_results_data, version=8, timeout=cache_timeout)
+
+    def get_demographic_anime_results_data(self, age_bands: Optional[list[str]] = None, genders: Optional[list[str]] = None) -> tuple[dict[int, dict[ResultType, float]], int]:
+        """Obtains the results for the survey provided when initializing, only taking into account responses from the given age bands and genders.
+
+        Parameters
+        ----------
+        age_bands : list[str], optional
+            The age bands (keys of AGE_BANDS) to take into account, or None to take into account all responses regardless of age.
+        genders : list[str], optional
+            The genders (Response.Gender values) to take into account, or None to take into account all responses regardless of gender.
+
+        Returns
+        -------
+        ({anime_id: {ResultType: float}}, int)
+            A dict where each anime has an associated dict of result values, and the amount of responses in the given age bands and genders.
+            Results that are split by gender are not included.
+        """
+        demographic_cube = self.get_demographic_cube()
+
+        def is_in_slice(age_band: str, gender: str) -> bool:
+            return (age_bands is None or age_band in age_bands) and (genders is None or gender in genders)
+
+        slice_response_count = sum(response_count for (age_band, gender), response_count in demographic_cube['response_counts'].items() if is_in_slice(age_band, gender))
+        total_response_count = demographic_cube['total_response_count']
+
+        anime_results_data = {}
+        for anime_id, anime_cells in demographic_cube['anime'].items():
+            slice_values = dict.fromkeys(DEMOGRAPHIC_CUBE_FIELDS, 0)
+            for (age_band, gender), cell_values in anime_cells.items():
+                if is_in_slice(age_band, gender):
+                    for field, value in zip(DEMOGRAPHIC_CUBE_FIELDS, cell_values):
+                        slice_values[field] += value
+
+            # Scale the slice's response count the same way the total response count was adjusted for anime added/removed during the survey
+            adjusted_response_count = demographic_cube['adjusted_response_counts'].get(anime_id, total_response_count)
+            scaled_slice_response_count = slice_response_count * div0(adjusted_response_count, total_response_count)
+
+            watcher_response_count = slice_values['watcher_count']
+            anime_results_data[anime_id] = replace_nans({
+                ResultType.POPULARITY:     div0(watcher_response_count, scaled_slice_response_count),
+                ResultType.UNDERWATCHED:   div0(slice_values['underwatched_count'], watcher_response_count),
+                ResultType.SCORE:          div0(slice_values['score_sum'], slice_values['score_count']),
+                ResultType.SURPRISE:       div0(slice_values['surprise_count'], watcher_response_count),
+                ResultType.DISAPPOINTMENT: div0(slice_values['disappointment_count'], watcher_response_count),
+                ResultType.AGE:            div0(slice_values['age_sum'], slice_values['age_count']),
+            })
+        return anime_results_data, slice_response_count
+
+    def get_demographic_cube(self) -> dict:
+        """Obtains the demographic cube of the survey provided when initializing, either from the cache or generated from database data.
+
+        The cube contains the response count and, for each anime, the sums of DEMOGRAPHIC_CUBE_FIELDS per combination of age band and gender,
+        so that results of any combination of age bands and genders can be calculated without going through the responses again.
+        Responses without a (valid) age or gender are in the '' age band or gender.
+
+        Returns
+        -------
+        dict
+            A dict with keys 'response_counts' ({(age_band, gender): int}), 'total_response_count' (int),
+            'adjusted_response_counts' ({anime_id: int}) and 'anime' ({anime_id: {(age_band, gender): tuple}}).
+        """
+        if self.survey.state != Survey.State.FINISHED:
+            return self.__generate_demographic_cube()
+        else:
+            cache_timeout = get_survey_cache_timeout(self.survey)
+            return get_or_set_single_flight(caches['long'], 'survey_demographics_%i' % self.survey.id, self.__generate_demographic_cube, version=1, timeout=cache_timeout)
+
+    def get_response_distributions(self) -> dict:
+        """Obtains the response count and the gender and age distributions of the survey provided when initializing, either from the cache or generated from database data.
+
+        Returns
+        -------
+        dict
+            A dict with keys 'response_count' (int), 'gender_distribution' ({gender: float}) and 'age_distribution' ({age: float}),
+            where the distributions contain the percentage of responses with each gender or age.
+        """
+        if self.survey.state != Survey.State.FINISHED:
+            return self.__generate_response_distributions()
+        else:
+            cache_timeout = get_survey_cache_timeout(self.survey)
+            return get_or_set_single_flight(caches['long'], 'survey_distributions_%i' % self.survey.id, self.__generate_response_distributions, version=1, timeout=cache_timeout)
+
+    def get_result_rankings(self, anime_results_data: Optional[dict[int, dict[ResultType, float]]] = None) -> dict:
+        """Obtains the rankings of the anime of the survey provided when initializing for each result type, either from the cache or generated from the results.
+
+        Parameters
+        ----------
+        anime_results_data : {anime_id: {ResultType: float}}, optional
+            The results of the survey (see get_anime_results_data) if they were already obtained, so that they don't have to be obtained again.
+
+        Returns
+        -------
+        dict
+            A dict with keys 'rankings' ({ResultType: [anime_id]}), containing the anime ids sorted by descending result value
+            (leaving out anime without a value), and 'series_anime_ids' ({anime_id}), containing the ids of anime series.
+        """
+        def generate_result_rankings() -> dict:
+            return self.__generate_result_rankings(anime_results_data if anime_results_data is not None else self.get_anime_results_data())
+
+        if self.survey.state != Survey.State.FINISHED:
+            return generate_result_rankings()
         else:
             cache_timeout = get_survey_cache_timeout(self.survey)
-            return caches['long'].get_or_set('survey_results_%i' % self.survey.id, self.__get_anime_results_data_internal, version=8, timeout=cache_timeout)
+            return get_or_set_single_flight(caches['long'], 'survey_rankings_%i' % self.survey.id, generate_result_rankings, version=1, timeout=cache_timeout)
+
+    def store_anime_results_data(self) -> bool:
+        """Stores the results of the finished survey provided when initializing in the database if they weren't stored yet, returns whether they were stored."""
+        if self.survey.state != Survey.State.FINISHED or SurveyAnimeResult.objects.filter(survey=self.survey).exists():
+            return False
+
+        # The results may have been cached before they were stored
+        self.__store_anime_results_data(self.get_anime_results_data())
+        return True
+
+    def clear_anime_results_data(self):
+        """Removes the cached and stored results of the survey provided when initializing, so that they will be regenerated."""
+        delete_single_flight(caches['long'], ['survey_results_%i' % self.survey.id], version=8)
+        delete_single_flight(caches['long'], ['survey_demographics_%i' % self.survey.id, 'survey_distributions_%i' % self.survey.id, 'survey_rankings_%i' % self.survey.id], version=1)
+        clear_cached_results_responses([self.survey])
+        SurveyAnimeResult.objects.filter(survey=self.survey).delete()
+
+    def generate_anime_results_data(self) -> dict[int, dict[ResultType, float]]:
+        """Generates the results for the survey provided when initializing from database data, bypassing the cache.
+
+        Returns
+        -------
+        {anime_id: {ResultType: float}}
+            A dict where each anime has an associated dict of result values.
+        """
+        # Get all counts/averages for all anime at once, grouped by anime, instead of running a dozen queries per anime
+        return self.__get_anime_results_data_from_aggregates(self.__get_anime_aggregates(), include_confidence_intervals=settings.RESULTS_CONFIDENCE_INTERVALS)
+
+    def __generate_result_rankings(self, anime_results_data: dict[int, dict[ResultType, float]]) -> dict:
+        resulttype_set = {resulttype for anime_results in anime_results_data.values() for resulttype in anime_results.keys()}
+
+        rankings = {
+            resulttype: [
+                anime_id for anime_id, _ in sorted(
+                    ((anime_id, anime_results.get(resulttype)) for anime_id, anime_results in anime_results_data.items() if anime_results.get(resulttype) is not None),
+                    key=lambda item: item[1],
+                    reverse=True,
+                )
+            ] for resulttype in sorted(resulttype_set)
+        }
+
+        _, anime_series_queryset, _ = get_survey_anime(self.survey)
+        return {
+            'rankings': rankings,
+            'series_anime_ids': set(anime_series_queryset.values_list('id', flat=True)),
+        }
 
-    def __get_anime_results_data_internal(self) -> dict[int, dict[ResultType, float]]:
+    def __generate_response_distributions(self) -> dict:
+        # Count the responses per combination of gender and age in a single query, both distributions can be derived from that
+        response_count_rows = Response.objects.filter(
+            survey=self.survey,
+        ).values('gender', 'age').annotate(count=Count('id')).order_by()
+
+        response_count = 0
+        gender_counts: dict[str, int] = {}
+        age_counts: dict[int, int] = {}
+        for response_count_row in response_count_rows:
+            gender, age, count = response_count_row['gender'], response_count_row['age'], response_count_row['count']
+            response_count += count
+            if gender:
+                gender_counts[gender] = gender_counts.get(gender, 0) + count
+            if age is not None and age > 0:
+                age_counts[age] = age_counts.get(age, 0) + count
+
+        gender_answers_count = max(sum(gender_counts.values()), 1)
+        gender_distribution = OrderedDict([
+            (gender, gender_counts.get(gender, 0) / gender_answers_count * 100)
+            for gender in [Response.Gender.MALE, Response.Gender.FEMALE, Response.Gender.OTHER]
+        ])
+
+        # Ages outside of the displayed range still count towards the total
+        age_answers_count = max(sum(age_counts.values()), 1)
+        age_distribution = OrderedDict([
+            (age, age_counts.get(age, 0) / (age_answers_count / 100.0))
+            for age in range(5, 81)
+        ])
+
+        return {
+            'response_count': response_count,
+            'gender_distribution': gender_distribution,
+            'age_distribution': age_distribution,
+        }
+
+    def __generate_demographic_cube(self) -> dict:
         survey = self.survey
 
+        def annotate_age_band(age_field: str) -> Case:
+            return Case(
+                *[When(**{age_field + '__gte': min_age, age_field + '__lte': max_age}, then=Value(age_band)) for age_band, (min_age, max_age) in AGE_BANDS.items()],
+                default=Value(''),
+                output_field=CharField(),
+            )
+
+        response_count_rows = Response.objects.filter(
+            survey=survey,
+        ).annotate(age_band=annotate_age_band('age')).values('age_band', 'gender').annotate(count=Count('id')).order_by()
+
+        response_counts: dict[tuple[str, str], int] = {}
+        for response_count_row in response_count_rows:
+            key = (response_count_row['age_band'], response_count_row['gender'] or '')
+            response_counts[key] = response_counts.get(key, 0) + response_count_row['count']
+        total_response_count = sum(response_counts.values())
+
+        watching_filter = Q(watching=True)
+        score_filter = Q(score__isnull=False) if survey.is_preseason else Q(score__isnull=False) & watching_filter
+        age_filter = watching_filter & Q(response__age__isnull=False)
+
+        # Aggregate all anime responses per anime, age band and gender in a single query
+        cell_rows = AnimeResponse.objects.filter(
+            response__survey=survey,
+        ).annotate(age_band=annotate_age_band('response__age')).values('anime_id', 'age_band', 'response__gender').annotate(
+            watcher_count=Count('id', filter=watching_filter),
+            underwatched_count=Count('id', filter=watching_filter & Q(underwatched=True)),
+            surprise_count=Count('id', filter=watching_filter & Q(expectations=AnimeResponse.Expectations.SURPRISE)),
+            disappointment_count=Count('id', filter=watching_filter & Q(expectations=AnimeResponse.Expectations.DISAPPOINTMENT)),
+            score_count=Count('id', filter=score_filter),
+            score_sum=Sum('score', filter=score_filter),
+            age_count=Count('id', filter=age_filter),
+            age_sum=Sum('response__age', filter=age_filter),
+        ).order_by()
+
         anime_list, _, _ = get_survey_anime(survey)
-        animeresponse_queryset = AnimeResponse.objects.filter(response__survey=survey)
-        surveyadditionsremovals_queryset = SurveyAdditionRemoval.objects.filter(survey=survey)
+        anime_cells: dict[int, dict[tuple[str, str], tuple]] = {anime.id: {} for anime in anime_list}
+        for cell_row in cell_rows:
+            cells = anime_cells.get(cell_row['anime_id'])
+            if cells is None:
+                continue
 
-        total_response_count = Response.objects.filter(survey=survey).count()
-        total_male_response_count = Response.objects.filter(survey=survey, gender=Response.Gender.MALE).count()
-        total_female_response_count = Response.objects.filter(survey=survey, gender=Response.Gender.FEMALE).count()
+            # Sums become None when there are no values to sum, and empty genders are merged with missing genders
+            key = (cell_row['age_band'], cell_row['response__gender'] or '')
+            cell_values = tuple(cell_row[field] or 0 for field in DEMOGRAPHIC_CUBE_FIELDS)
+            previous_cell_values = cells.get(key)
+            cells[key] = tuple(map(sum, zip(previous_cell_values, cell_values))) if previous_cell_values else cell_values
 
-        # Get a dict of data values for each anime (i.e. a dict with for each anime a dict with data values, dict[anime][data])
         return {
-            anime.id: self.__get_data_for_anime(anime, animeresponse_queryset, surveyadditionsremovals_queryset, total_response_count, total_male_response_count, total_female_response_count) for anime in anime_list
+            'response_counts': response_counts,
+            'total_response_count': total_response_count,
+            'adjusted_response_counts': get_adjusted_response_counts(survey, total_response_count),
+            'anime': anime_cells,
         }
 
-    # Returns a dict of data values for an anime
-    def __get_data_for_anime(self, anime, animeresponse_queryset, surveyadditionsremovals_queryset, total_response_count, total_male_response_count, total_female_response_count) -> dict[ResultType, float]:
+    def __get_finished_anime_results_data(self) -> dict[int, dict[ResultType, float]]:
+        # Results of finished surveys are stored in the database once, so they don't have to be regenerated when the cache gets lost
+        surveyanimeresult_list = list(SurveyAnimeResult.objects.filter(survey=self.survey).order_by('anime_id', 'id'))
+        if surveyanimeresult_list:
+            anime_results_data: dict[int, dict[ResultType, float]] = {}
+            for surveyanimeresult in surveyanimeresult_list:
+                anime_results_data.setdefault(surveyanimeresult.anime_id, {})[ResultType(surveyanimeresult.result_type)] = surveyanimeresult.value
+            return anime_results_data
+
+        anime_results_data = self.generate_anime_results_data()
+        self.__store_anime_results_data(anime_results_data)
+        return anime_results_data
+
+    def __store_anime_results_data(self, anime_results_data: dict[int, dict[ResultType, float]]):
+        SurveyAnimeResult.objects.bulk_create([
+            SurveyAnimeResult(survey=self.survey, anime_id=anime_id, result_type=result_type.value, value=value)
+            for anime_id, anime_results in anime_results_data.items()
+            for result_type, value in anime_results.items()
+        ], ignore_conflicts=True)
+
+    def __get_anime_results_data_from_aggregates(self, anime_aggregates_dict: dict[int, dict[str, Optional[float]]], include_confidence_intervals: bool = False) -> dict[int, dict[ResultType, float]]:
         survey = self.survey
 
-        anime_animeresponse_qs = animeresponse_queryset.filter(anime=anime)
-        watchers_animeresponse_qs = anime_animeresponse_qs.filter(watching=True)
+        anime_list, _, _ = get_survey_anime(survey)
+
+        response_counts = Response.objects.filter(survey=survey).aggregate(
+            total_count=Count('id'),
+            male_count=Count('id', filter=Q(gender=Response.Gender.MALE)),
+            female_count=Count('id', filter=Q(gender=Response.Gender.FEMALE)),
+        )
+
+        # Adjust response counts taking into account the times anime were added/removed to the survey
+        adjusted_response_counts = get_adjusted_response_counts(survey, response_counts['total_count'])
+
+        # Get a dict of data values for each anime (i.e. a dict with for each anime a dict with data values, dict[anime][data])
+        anime_results_data = {
+            anime.id: self.__get_data_for_anime(
+                anime_aggregates_dict.get(anime.id, EMPTY_ANIME_AGGREGATES),
+                adjusted_response_counts.get(anime.id, response_counts['total_count']),
+                response_counts['male_count'],
+                response_counts['female_count'],
+            ) for anime in anime_list
+        }
+
+        if include_confidence_intervals and anime_results_data:
+            from survey.util.results_numpy import get_bootstrap_confidence_intervals
+
+            anime_ids = list(anime_results_data.keys())
+            score_counts_dict = self.__get_score_counts()
+            confidence_intervals = get_bootstrap_confidence_intervals(
+                anime_ids=anime_ids,
+                watcher_counts=[anime_aggregates_dict.get(anime_id, EMPTY_ANIME_AGGREGATES)['watcher_count'] for anime_id in anime_ids],
+                response_counts=[adjusted_response_counts.get(anime_id, response_counts['total_count']) for anime_id in anime_ids],
+                score_counts=[score_counts_dict.get(anime_id, [0] * 5) for anime_id in anime_ids],
+                seed=survey.id,
+            )
+            for anime_id, anime_results in anime_results_data.items():
+                anime_results.update(confidence_intervals[anime_id])
+
+        return anime_results_data
+
+    def __get_anime_aggregates(self) -> dict[int, dict[str, Optional[float]]]:
+        if self.backend == 'numpy':
+            # Only import NumPy when it's actually used
+            from survey.util.results_numpy import get_anime_aggregates_numpy
+            return get_anime_aggregates_numpy(self.survey)
+        else:
+            return {
+                anime_aggregates['anime_id']: anime_aggregates for anime_aggregates in self.__get_anime_aggregates_queryset()
+            }
+
+    def __get_anime_aggregates_queryset(self):
+        """Creates a queryset that aggregates the anime responses of the survey into counts and averages, with one row per anime."""
+        watching_filter = Q(watching=True)
+        male_filter = Q(response__gender=Response.Gender.MALE)
+        female_filter = Q(response__gender=Response.Gender.FEMALE)
+
+        # Pre-season surveys take into account everyone's expected score, post-season surveys only take into account watchers' scores
+        score_filter = Q(score__isnull=False) if self.survey.is_preseason else Q(score__isnull=False) & watching_filter
+
+        return AnimeResponse.objects.filter(
+            response__survey=self.survey,
+        ).values('anime_id').annotate(
+            watcher_count=Count('id', filter=watching_filter),
+            male_watcher_count=Count('id', filter=watching_filter & male_filter),
+            female_watcher_count=Count('id', filter=watching_filter & female_filter),
+            underwatched_count=Count('id', filter=watching_filter & Q(underwatched=True)),
+            surprise_count=Count('id', filter=watching_filter & Q(expectations=AnimeResponse.Expectations.SURPRISE)),
+            disappointment_count=Count('id', filter=watching_filter & Q(expectations=AnimeResponse.Expectations.DISAPPOINTMENT)),
+            average_score=Avg('score', filter=score_filter),
+            male_average_score=Avg('score', filter=score_filter & male_filter),
+            female_average_score=Avg('score', filter=score_filter & female_filter),
+            average_age=Avg('response__age', filter=watching_filter),
+        ).order_by()
+
+    def __get_score_counts(self) -> dict[int, list[int]]:
+        """Gets for each anime how many times each score from 1 to 5 was given, taking into account the same scores as the average score does."""
+        watching_filter = Q(watching=True)
+        score_filter = Q(score__isnull=False) if self.survey.is_preseason else Q(score__isnull=False) & watching_filter
 
-        # Adjust response count for this anime taking into account the times the anime was added/removed to the survey
-        addition_removal_list = list(surveyadditionsremovals_queryset.filter(anime=anime))
-        scaled_total_response_count = self.__get_adjusted_response_count(addition_removal_list, total_response_count)
+        score_counts_dict: dict[int, list[int]] = {}
+        score_count_rows = AnimeResponse.objects.filter(
+            score_filter,
+            response__survey=self.survey,
+        ).values('anime_id', 'score').annotate(count=Count('id')).order_by()
+        for score_count_row in score_count_rows:
+            if 1 <= score_count_row['score'] <= 5:
+                score_counts_dict.setdefault(score_count_row['anime_id'], [0] * 5)[score_count_row['score'] - 1] = score_count_row['count']
+        return score_counts_dict
 
+    # Returns a dict of data values for an anime
+    def __get_data_for_anime(self, anime_aggregates, scaled_total_response_count, total_male_response_count, total_female_response_count) -> dict[ResultType, float]:
         # Amount of people watching
-        watcher_response_count = watchers_animeresponse_qs.count()
-        male_watcher_response_count = watchers_animeresponse_qs.filter(response__gender=Response.Gender.MALE).count()
-        female_watcher_response_count = watchers_animeresponse_qs.filter(response__gender=Response.Gender.FEMALE).count()
+        watcher_response_count = anime_aggregates['watcher_count']
 
-        male_popularity = div0(male_watcher_response_count, total_male_response_count)
-        female_popularity = div0(female_watcher_response_count, total_female_response_count)
+        male_popularity = div0(anime_aggregates['male_watcher_count'], total_male_response_count)
+        female_popularity = div0(anime_aggregates['female_watcher_count'], total_female_response_count)
 
-        score_animeresponse_qs = anime_animeresponse_qs.filter(score__isnull=False) if survey.is_preseason else watchers_animeresponse_qs.filter(score__isnull=False)
         # The aggregate becomes None when there are no scores which causes errors, hence "or NaN" being necessary
-        average_score = score_animeresponse_qs.aggregate(Avg('score'))['score__avg'] or float('NaN')
-        male_average_score = score_animeresponse_qs.filter(response__gender=Response.Gender.MALE).aggregate(Avg('score'))['score__avg'] or float('NaN')
-        female_average_score = score_animeresponse_qs.filter(response__gender=Response.Gender.FEMALE).aggregate(Avg('score'))['score__avg'] or float('NaN')
+        average_score = anime_aggregates['average_score'] or float('NaN')
+        male_average_score = anime_aggregates['male_average_score'] or float('NaN')
+        female_average_score = anime_aggregates['female_average_score'] or float('NaN')
 
         results_data = {
             ResultType.POPULARITY:                  div0(watcher_response_count, scaled_total_response_count),
             ResultType.POPULARITY_MALE:               male_popularity,
             ResultType.POPULARITY_FEMALE:           female_popularity,
             ResultType.GENDER_POPULARITY_RATIO:     div0(male_popularity, female_popularity),
-            ResultType.UNDERWATCHED:                div0(watchers_animeresponse_qs.filter(underwatched=True).count(), watcher_response_count),
+            ResultType.UNDERWATCHED:                div0(anime_aggregates['underwatched_count'], watcher_response_count),
             ResultType.SCORE:                              average_score,
             ResultType.SCORE_MALE:                    male_average_score,
             ResultType.SCORE_FEMALE:                female_average_score,
             ResultType.GENDER_SCORE_DIFFERENCE:     male_average_score - female_average_score if min(male_average_score, female_average_score) > 0 else float('NaN'),
-            ResultType.SURPRISE:                    div0(watchers_animeresponse_qs.filter(expectations=AnimeResponse.Expectations.SURPRISE      ).count(), watcher_response_count),
-            ResultType.DISAPPOINTMENT:              div0(watchers_animeresponse_qs.filter(expectations=AnimeResponse.Expectations.DISAPPOINTMENT).count(), watcher_response_count),
-            ResultType.AGE:                         watchers_animeresponse_qs.aggregate(avg_age=Avg('response__age'))['avg_age'] or float('NaN'),
+            ResultType.SURPRISE:                    div0(anime_aggregates['surprise_count'], watcher_response_count),
+            ResultType.DISAPPOINTMENT:              div0(anime_aggregates['disappointment_count'], watcher_response_count),
+            ResultType.AGE:                         anime_aggregates['average_age'] or float('NaN'),
         }
         return replace_nans(results_data)
 
-    def __get_adjusted_response_count(self, addition_removal_list: list[SurveyAdditionRemoval], response_count: int) -> int:
-        i = 0
-        last_count = 0
-        adjusted_response_count = response_count
 
-        while i < len(addition_removal_list):
-            # If addition, addition's count - last count, and move index one up
-            if addition_removal_list[i].is_addition:
-                addition_count = addition_removal_list[i].response_count
-                removal_count = last_count
+def get_anime_results_history(anime_id: int) -> list[tuple[Survey, dict[ResultType, float]]]:
+    """Gets the results of an anime in every finished survey it was in, from the stored results of those surveys.
 
-                adjusted_response_count -= addition_count - removal_count
-                last_count = addition_count
-                i += 1
-            
-            # If removal, next addition's count - this removal's count, move index to after addition
-            else:
-                removal_count = addition_removal_list[i].response_count
-                addition_count = response_count
-                i += 1
-                
-                # Try to find index of next addition
-                while i < len(addition_removal_list) and not addition_removal_list[i].is_addition:
-                    i += 1
-                addition_count = addition_removal_list[i].response_count if i < len(addition_removal_list) else response_count
-
-                adjusted_response_count -= addition_count - removal_count
-                last_count = addition_count
+    Only surveys whose results have been stored are included, see ResultsGenerator.get_anime_results_data and the storesurveyresults command.
+
+    Parameters
+    ----------
+    anime_id : int
+        The anime's ID.
+
+    Returns
+    -------
+    [(Survey, {ResultType: float})]
+        A list of surveys with the anime's result values in that survey, from oldest to newest survey.
+    """
+    surveyanimeresult_queryset = SurveyAnimeResult.objects.filter(
+        anime_id=anime_id,
+        survey__closing_time__lt=timezone.now(),
+    ).select_related('survey').order_by('survey__year', 'survey__season', '-survey__is_preseason', 'id')
+
+    anime_results_history: dict[int, tuple[Survey, dict[ResultType, float]]] = {}
+    for surveyanimeresult in surveyanimeresult_queryset:
+        _, anime_results = anime_results_history.setdefault(surveyanimeresult.survey_id, (surveyanimeresult.survey, {}))
+        anime_results[ResultType(surveyanimeresult.result_type)] = surveyanimeresult.value
+    return list(anime_results_history.values())
+
+
+def get_results_response_cache_key(year: int, season: int, is_preseason: bool, response_format: str = 'default') -> str:
+    """Gets the cache key of a finished survey's serialized results response, which is based on the URL parameters so that it can be looked up without loading the survey."""
+    return 'survey_results_response_%i_%i_%s_%s' % (year, season, 'pre' if is_preseason else 'post', response_format)
+
+
+def clear_cached_results_responses(surveys: Iterable[Survey]):
+    """Removes the cached serialized results responses and the static snapshots of the given surveys, e.g. after the anime they contain were changed.
+
+    The cached index response and index snapshot are removed as well, as they contain the top results of the surveys.
+    """
+    surveys = list(surveys)
+    delete_single_flight(caches['long'], [
+        get_results_response_cache_key(survey.year, survey.season, survey.is_preseason, response_format)
+        for survey in surveys for response_format in RESULTS_RESPONSE_FORMATS
+    ], version=2)
+
+    for survey in surveys:
+        for response_format in RESULTS_RESPONSE_FORMATS:
+            delete_snapshot(get_results_snapshot_path(survey.year, survey.season, survey.is_preseason, response_format))
+    clear_cached_index_response()
+
+
+def clear_cached_anime_data(surveys: Iterable[Survey] = ()):
+    """Removes the cached data containing anime, e.g. after anime, their names or their images were changed.
+
+    The image ids and survey form catalogues of all surveys are removed, as a changed anime may have moved to other surveys, along with the index.
+    Results responses and snapshots are only removed for the given surveys, which should be the surveys containing the changed anime.
+    """
+    survey_ids = list(Survey.objects.values_list('id', flat=True))
+    clear_cached_survey_image_ids(survey_ids)
+    clear_cached_survey_form_catalogues(survey_ids)
+    clear_cached_results_responses(surveys)
+
+
+def clear_cached_index_response():
+    """Removes the cached serialized index response and the index snapshot, e.g. after a survey was added."""
+    delete_single_flight(caches['long'], [INDEX_RESPONSE_CACHE_KEY], version=1)
+    delete_snapshot(get_index_snapshot_path())
+
+
+def get_adjusted_response_counts(survey: Survey, response_count: int) -> dict[int, int]:
+    """Adjusts the response count of all anime that were added to/removed from the survey while the survey was ongoing, see get_adjusted_response_count.
+
+    Parameters
+    ----------
+    survey : Survey
+        The survey.
+    response_count : int
+        The total response count of the survey.
+
+    Returns
+    -------
+    {anime_id: int}
+        A dict with the adjusted response count of each anime that was added/removed. Other anime should use the total response count.
+    """
+    addition_removal_lists: dict[int, list[SurveyAdditionRemoval]] = {}
+    for addition_removal in SurveyAdditionRemoval.objects.filter(survey=survey).order_by('anime_id', 'id'):
+        addition_removal_lists.setdefault(addition_removal.anime_id, []).append(addition_removal)
+
+    return {
+        anime_id: get_adjusted_response_count(addition_removal_list, response_count)
+        for anime_id, addition_removal_list in addition_removal_lists.items()
+    }
+
+
+def get_adjusted_response_count(addition_removal_list: list[SurveyAdditionRemoval], response_count: int) -> int:
+    """Adjusts the response count of an anime for the times it was added to/removed from the survey while the survey was ongoing.
+
+    Parameters
+    ----------
+    addition_removal_list : list[SurveyAdditionRemoval]
+        The additions/removals of the anime in the survey, in chronological order.
+    response_count : int
+        The total response count of the survey.
+
+    Returns
+    -------
+    int
+        The amount of responses that were submitted while the anime was part of the survey.
+    """
+    i = 0
+    last_count = 0
+    adjusted_response_count = response_count
+
+    while i < len(addition_removal_list):
+        # If addition, addition's count - last count, and move index one up
+        if addition_removal_list[i].is_addition:
+            addition_count = addition_removal_list[i].response_count
+            removal_count = last_count
+
+            adjusted_response_count -= addition_count - removal_count
+            last_count = addition_count
+            i += 1
+
+        # If removal, next addition's count - this removal's count, move index to after addition
+        else:
+            removal_count = addition_removal_list[i].response_count
+            addition_count = response_count
+            i += 1
+
+            # Try to find index of next addition
+            while i < len(addition_removal_list) and not addition_removal_list[i].is_addition:
                 i += 1
+            addition_count = addition_removal_list[i].response_count if i < len(addition_removal_list) else response_count
+
+            adjusted_response_count -= addition_count - removal_count
+            last_count = addition_count
+            i += 1
 
-        return adjusted_response_count
+    return adjusted_response_count
 
 
 def div0(a: float, b: float) -> float:
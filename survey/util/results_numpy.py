@@ -0,0 +1,154 @@
+import numpy as np
+from survey.models import AnimeResponse, Response, Survey
+from survey.util.data import ResultType
+from typing import Optional
+
+
+def get_anime_aggregates_numpy(survey: Survey) -> dict[int, dict[str, Optional[float]]]:
+    """Aggregates a survey's anime responses into counts and averages per anime using NumPy instead of the database.
+
+    All anime responses of the survey are loaded once into flat arrays, after which each aggregate is computed
+    for all anime at once using bincounts and masked means.
+
+    Parameters
+    ----------
+    survey : Survey
+        The survey whose anime responses have to be aggregated.
+
+    Returns
+    -------
+    {anime_id: {str: float}}
+        A dict where each anime that has responses has an associated dict of aggregates, in the same format as ResultsGenerator's database aggregates.
+    """
+    animeresponse_rows = list(AnimeResponse.objects.filter(response__survey=survey).values_list(
+        'anime_id', 'watching', 'underwatched', 'expectations', 'score', 'response__gender', 'response__age',
+    ))
+    if not animeresponse_rows:
+        return {}
+
+    anime_ids, watching, underwatched, expectations, scores, genders, ages = zip(*animeresponse_rows)
+
+    # Map each anime ID to an index, bincounts then give an array of values with one value per anime
+    anime_id_array, anime_indices = np.unique(np.array(anime_ids), return_inverse=True)
+    anime_count = len(anime_id_array)
+
+    # None becomes NaN in float arrays
+    scores = np.array(scores, dtype=float)
+    ages = np.array(ages, dtype=float)
+    genders = np.array(genders, dtype=object)
+    expectations = np.array(expectations, dtype=object)
+
+    is_watching = np.array(watching, dtype=bool)
+    is_underwatched = np.array(underwatched, dtype=bool)
+    is_male = genders == Response.Gender.MALE
+    is_female = genders == Response.Gender.FEMALE
+    has_score = ~np.isnan(scores)
+    has_age = ~np.isnan(ages)
+
+    # Pre-season surveys take into account everyone's expected score, post-season surveys only take into account watchers' scores
+    is_score_counted = has_score if survey.is_preseason else has_score & is_watching
+
+    def count(mask: np.ndarray) -> np.ndarray:
+        return np.bincount(anime_indices[mask], minlength=anime_count)
+
+    def mean(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        counts = count(mask)
+        sums = np.bincount(anime_indices[mask], weights=values[mask], minlength=anime_count)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan)
+
+    aggregate_arrays = {
+        'watcher_count':        count(is_watching),
+        'male_watcher_count':   count(is_watching & is_male),
+        'female_watcher_count': count(is_watching & is_female),
+        'underwatched_count':   count(is_watching & is_underwatched),
+        'surprise_count':       count(is_watching & (expectations == AnimeResponse.Expectations.SURPRISE)),
+        'disappointment_count': count(is_watching & (expectations == AnimeResponse.Expectations.DISAPPOINTMENT)),
+        'average_score':        mean(scores, is_score_counted),
+        'male_average_score':   mean(scores, is_score_counted & is_male),
+        'female_average_score': mean(scores, is_score_counted & is_female),
+        'average_age':          mean(ages, is_watching & has_age),
+    }
+
+    # Convert to plain Python values, with averages without any values becoming None like database aggregates do
+    aggregate_lists = {
+        name: [None if value != value else value for value in array.tolist()]
+        for name, array in aggregate_arrays.items()
+    }
+    return {
+        anime_id: {name: values[idx] for name, values in aggregate_lists.items()}
+        for idx, anime_id in enumerate(anime_id_array.tolist())
+    }
+
+
+def get_bootstrap_confidence_intervals(
+    anime_ids: list[int],
+    watcher_counts: list[int],
+    response_counts: list[int],
+    score_counts: list[list[int]],
+    sample_count: int = 1000,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+) -> dict[int, dict[ResultType, Optional[float]]]:
+    """Estimates confidence intervals of the popularity and score of a set of anime using bootstrapping.
+
+    All anime are resampled at once: resampling the respondents of an anime comes down to drawing from a binomial
+    distribution for popularity and from a multinomial distribution over the possible scores for score.
+
+    Parameters
+    ----------
+    anime_ids : list[int]
+        The IDs of the anime.
+    watcher_counts : list[int]
+        For each anime, the amount of people watching it.
+    response_counts : list[int]
+        For each anime, the amount of responses its popularity is relative to.
+    score_counts : list[list[int]]
+        For each anime, how many times it was given each score from 1 to 5.
+    sample_count : int
+        The amount of bootstrap samples.
+    confidence : float
+        The confidence level of the intervals.
+    seed : int, optional
+        Seed for the random number generator, so that the same data gives the same intervals.
+
+    Returns
+    -------
+    {anime_id: {ResultType: float}}
+        A dict where each anime has an associated dict with the lower and upper bounds of its popularity and score.
+    """
+    rng = np.random.default_rng(seed)
+    percentiles = [(1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100]
+
+    watcher_counts = np.array(watcher_counts, dtype=np.int64)
+    response_counts = np.array(response_counts, dtype=np.int64)
+    has_responses = response_counts > 0
+    safe_response_counts = np.maximum(response_counts, 1)
+    popularities = np.clip(watcher_counts / safe_response_counts, 0, 1)
+
+    popularity_samples = rng.binomial(np.where(has_responses, response_counts, 0), popularities, size=(sample_count, len(anime_ids))) / safe_response_counts
+    popularity_bounds = np.percentile(popularity_samples, percentiles, axis=0)
+
+    score_counts = np.array(score_counts, dtype=np.int64).reshape(len(anime_ids), 5)
+    score_totals = score_counts.sum(axis=1)
+    has_scores = score_totals > 0
+    safe_score_totals = np.maximum(score_totals, 1)
+    # Anime without scores still need valid probabilities, their samples are discarded anyway
+    score_probabilities = np.where(has_scores[:, np.newaxis], score_counts / safe_score_totals[:, np.newaxis], 1 / 5)
+
+    score_samples = rng.multinomial(score_totals, score_probabilities, size=(sample_count, len(anime_ids))) @ np.arange(1, 6) / safe_score_totals
+    score_bounds = np.percentile(score_samples, percentiles, axis=0)
+
+    def to_list(bounds: np.ndarray, mask: np.ndarray) -> list[Optional[float]]:
+        return [value if is_valid else None for value, is_valid in zip(bounds.tolist(), mask.tolist())]
+
+    popularity_lower_bounds, popularity_upper_bounds = to_list(popularity_bounds[0], has_responses), to_list(popularity_bounds[1], has_responses)
+    score_lower_bounds, score_upper_bounds = to_list(score_bounds[0], has_scores), to_list(score_bounds[1], has_scores)
+    return {
+        anime_id: {
+            ResultType.POPULARITY_LOWER_BOUND: popularity_lower_bounds[idx],
+            ResultType.POPULARITY_UPPER_BOUND: popularity_upper_bounds[idx],
+            ResultType.SCORE_LOWER_BOUND:      score_lower_bounds[idx],
+            ResultType.SCORE_UPPER_BOUND:      score_upper_bounds[idx],
+        } for idx, anime_id in enumerate(anime_ids)
+    }
@@ -0,0 +1,56 @@
+from django.conf import settings
+import os
+from pathlib import Path
+import tempfile
+from typing import Any
+
+
+# File name suffixes of the compressed variants of a snapshot, as expected by nginx's gzip_static (and brotli_static)
+SNAPSHOT_ENCODING_SUFFIXES = {
+    'gzip': '.gz',
+    'br': '.br',
+}
+
+
+def get_results_snapshot_path(year: int, season: int, is_preseason: bool, response_format: str = 'default') -> Path:
+    """Gets the path of a finished survey's results snapshot in STATIC_ROOT, which mirrors the URL of the results API."""
+    return Path(settings.STATIC_ROOT) / 'api' / 'survey' / str(year) / str(season) / ('pre' if is_preseason else 'post') / 'results' / ('%s.json' % response_format)
+
+def get_index_snapshot_path() -> Path:
+    """Gets the path of the index snapshot in STATIC_ROOT, which mirrors the URL of the index API."""
+    return Path(settings.STATIC_ROOT) / 'api' / 'index' / 'default.json'
+
+
+def write_snapshot(path: Path, payload: dict[str, Any]):
+    """Writes a payload created by get_preserialized_json_payload to a file, along with its compressed bodies.
+
+    Every file is replaced atomically, so a static file server never serves a partially written snapshot.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for encoding, suffix in SNAPSHOT_ENCODING_SUFFIXES.items():
+        encoded_path = path.with_name(path.name + suffix)
+        if encoding in payload['encodings']:
+            write_file_atomically(encoded_path, payload['encodings'][encoding])
+        else:
+            encoded_path.unlink(missing_ok=True)
+    write_file_atomically(path, payload['body'])
+
+def delete_snapshot(path: Path):
+    """Deletes a snapshot and its compressed bodies, if they exist."""
+    path.unlink(missing_ok=True)
+    for suffix in SNAPSHOT_ENCODING_SUFFIXES.values():
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def write_file_atomically(path: Path, content: bytes):
+    """Writes content to a temporary file next to path, and replaces path with it."""
+    file_descriptor, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.' + path.name)
+    try:
+        with os.fdopen(file_descriptor, 'wb') as file:
+            file.write(content)
+        # Temporary files are only readable by their owner, but the static file server has to be able to read them
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
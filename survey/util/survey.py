@@ -1,9 +1,12 @@
 from datetime import datetime
+from django.core.cache import caches
 from django.db.models import Q
+from django.utils import timezone
 from random import randint
-from survey.models import Anime, Survey
+from survey.models import Anime, Image, Survey, SurveyAnimeResult
 from survey.util.anime import anime_series_filter, annotate_year_season, calc_season_difference, combine_year_season, is_ongoing_filter_func, special_anime_filter
-from typing import Optional, Union
+from survey.util.cache import delete_single_flight
+from typing import Iterable, Optional, Union
 
 
 def try_get_survey(year: int, season: Anime.AnimeSeason, pre_or_post: str) -> Union[Survey, None]:
@@ -68,6 +71,38 @@ def get_survey_anime(survey: Survey):
     return combined_anime_queryset, anime_series_queryset, special_anime_queryset
 
 
+def get_surveys_with_anime(anime: Anime) -> list[Survey]:
+    """Gets the surveys an anime is in: the finished surveys whose stored results contain it, and the other surveys whose anime include it."""
+    now = timezone.now()
+    finished_survey_ids = SurveyAnimeResult.objects.filter(anime=anime, survey__closing_time__lt=now).values('survey_id')
+    survey_list = list(Survey.objects.filter(id__in=finished_survey_ids))
+    for survey in Survey.objects.filter(closing_time__gte=now):
+        survey_anime_queryset, _, _ = get_survey_anime(survey)
+        if survey_anime_queryset.filter(id=anime.id).exists():
+            survey_list.append(survey)
+    return survey_list
+
+
+def get_survey_image_ids(survey: Survey) -> list[int]:
+    """Gets the ids of the images of all anime in the given survey, from the cache if possible.
+
+    The cached ids are cleared by the signal receivers in survey.signals when the survey, anime or their images change.
+    """
+    def get_image_ids() -> list[int]:
+        anime_queryset, _, _ = get_survey_anime(survey)
+        return list(Image.objects.filter(anime__in=anime_queryset).values_list('id', flat=True))
+
+    return caches['long'].get_or_set('survey_image_ids_%i' % survey.id, get_image_ids, timeout=get_survey_cache_timeout(survey), version=1)
+
+def clear_cached_survey_image_ids(survey_ids: Iterable[int]):
+    """Removes the cached image ids (see get_survey_image_ids) of the surveys with the given ids."""
+    caches['long'].delete_many(['survey_image_ids_%i' % survey_id for survey_id in survey_ids], version=1)
+
+def clear_cached_survey_form_catalogues(survey_ids: Iterable[int]):
+    """Removes the cached survey form catalogues of the surveys with the given ids."""
+    delete_single_flight(caches['long'], ['survey_form_catalogue_%i' % survey_id for survey_id in survey_ids], version=1)
+
+
 def get_old_survey_cache_timeout() -> Optional[int]:
     return None
 
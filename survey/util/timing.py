@@ -0,0 +1,86 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.core.cache import BaseCache
+from functools import wraps
+import time
+from typing import Iterator, Optional
+
+
+CACHE_METHOD_NAMES = ['get', 'set', 'add', 'delete', 'touch', 'has_key', 'get_many', 'set_many', 'delete_many', 'get_or_set']
+
+
+class RequestTimings:
+    """Durations (in seconds) of the parts of a request that are measured by ServerTimingMiddleware."""
+    def __init__(self):
+        self.db_duration = 0.0
+        self.db_query_count = 0
+        self.cache_durations: dict[str, float] = {}
+        self.cache_call_counts: dict[str, int] = {}
+        self.encode_duration = 0.0
+        self.view_duration = 0.0
+        self.view_start_time: Optional[float] = None
+
+        # Cache methods call each other (e.g. get_or_set calls get and add), only the outermost call is measured
+        self.cache_call_depth = 0
+
+
+current_timings: ContextVar[Optional[RequestTimings]] = ContextVar('current_timings', default=None)
+
+
+@contextmanager
+def measure_encode() -> Iterator[None]:
+    """Adds the duration of the block to the current request's JSON encoding time, if timings are being measured."""
+    timings = current_timings.get()
+    if timings is None:
+        yield
+        return
+
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.encode_duration += time.perf_counter() - start_time
+
+
+def measure_db_query(execute, sql, params, many, context):
+    """Database execute wrapper (see connection.execute_wrapper) that adds each query's duration to the current request's timings."""
+    timings = current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+
+    start_time = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db_duration += time.perf_counter() - start_time
+        timings.db_query_count += 1
+
+
+def instrument_cache(cache: BaseCache, alias: str):
+    """Wraps the methods of a cache instance so that their durations are added to the current request's timings.
+
+    Django creates a cache instance per alias per thread, so this only needs to be done once per instance.
+    """
+    if getattr(cache, '_is_timing_instrumented', False):
+        return
+
+    def instrument_method(method):
+        @wraps(method)
+        def instrumented_method(*args, **kwargs):
+            timings = current_timings.get()
+            if timings is None or timings.cache_call_depth > 0:
+                return method(*args, **kwargs)
+
+            timings.cache_call_depth += 1
+            start_time = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                timings.cache_call_depth -= 1
+                timings.cache_durations[alias] = timings.cache_durations.get(alias, 0.0) + time.perf_counter() - start_time
+                timings.cache_call_counts[alias] = timings.cache_call_counts.get(alias, 0) + 1
+        return instrumented_method
+
+    for method_name in CACHE_METHOD_NAMES:
+        setattr(cache, method_name, instrument_method(getattr(cache, method_name)))
+    cache._is_timing_instrumented = True
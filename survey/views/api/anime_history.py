@@ -0,0 +1,38 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from django.http.request import HttpRequest
+from django.http.response import JsonResponse
+from django.views.generic import View
+from http import HTTPStatus
+from survey.models import Anime
+from survey.util.data import AnimeViewModel, ResultType, SurveyViewModel, ViewModelBase, json_encoder_factory
+from survey.util.http import HttpEmptyErrorResponse
+from survey.util.results import get_anime_results_history
+
+class AnimeHistoryApi(View):
+    def get(self, request: HttpRequest, *args, **kwargs):
+        anime = Anime.objects.filter(id=self.kwargs['anime_id']).prefetch_related('animename_set', 'image_set').first()
+        if anime is None:
+            return HttpEmptyErrorResponse(HTTPStatus.NOT_FOUND)
+
+        history = [
+            AnimeHistorySurveyViewModel(survey=SurveyViewModel.from_model(survey), results=anime_results)
+            for survey, anime_results in get_anime_results_history(anime.id)
+        ]
+
+        json_encoder = json_encoder_factory()
+        return JsonResponse(AnimeHistoryViewModel(
+            anime=AnimeViewModel.from_model(anime),
+            history=history,
+        ), encoder=json_encoder, safe=False)
+
+
+@dataclass
+class AnimeHistoryViewModel(ViewModelBase):
+    anime: AnimeViewModel
+    history: list[AnimeHistorySurveyViewModel]
+
+@dataclass
+class AnimeHistorySurveyViewModel(ViewModelBase):
+    survey: SurveyViewModel
+    results: dict[ResultType, float]
@@ -1,20 +1,28 @@
 from __future__ import annotations
 from dataclasses import dataclass
+from django.core.cache import caches
 from django.http import HttpRequest, HttpResponse, JsonResponse
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import never_cache
+from django.utils import timezone
+from django.utils.cache import add_never_cache_headers
 from django.views.generic import View
+import json
 import math
-from survey.models import Anime, Image, Survey
+import random
+from survey.models import Image, Survey
+from survey.util.anime import get_anime_view_models
+from survey.util.cache import get_or_set_single_flight
 from survey.util.data import ViewModelBase, ImageViewModel, ResultType, SurveyViewModel, json_encoder_factory, AnimeViewModel
-from survey.util.results import ResultsGenerator
-from survey.util.survey import get_survey_anime
+from survey.util.http import get_preserialized_json_payload, get_preserialized_json_response
+from survey.util.results import INDEX_RESPONSE_CACHE_KEY, ResultsGenerator
+from survey.util.snapshots import delete_snapshot, get_index_snapshot_path, write_snapshot
+from survey.util.survey import get_survey_image_ids
 from typing import Optional
 
 
-# Don't cache the index, we perform caching on the computationally-intensive part of this (gathering survey results data),
-# and we don't want users to see surveys still being closed/open when they've just opened/closed
-@method_decorator(never_cache, name='get')
+# Only cache the index until the next survey opens or closes, so that users don't see surveys still being closed/open when they've just opened/closed
+INDEX_CACHE_MAX_TIMEOUT = 60*60*8
+
+
 class IndexApi(View):
     def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
         year_param = request.GET.get('year', '')
@@ -22,39 +30,122 @@ class IndexApi(View):
             year = int(year_param) if year_param else None
         except ValueError:
             return JsonResponse({})
-        
-        survey_list: list[Survey] = list(Survey.objects.filter(year=year) if year else Survey.objects.all())
+
+        if year is None:
+            return get_preserialized_json_response(request, get_index_response_payload())
+
+        survey_list: list[Survey] = list(Survey.objects.filter(year=year))
         jsonEncoder = json_encoder_factory()
+        response = JsonResponse(get_index_survey_view_models(survey_list), encoder=jsonEncoder, safe=False)
+        # Year-filtered indexes aren't cached, so that surveys opening or closing show up immediately
+        add_never_cache_headers(response)
+        return response
+
+
+def get_index_response_payload() -> dict:
+    """Gets the serialized index of all surveys (see get_preserialized_json_payload) from the cache, or generates it.
+
+    The cached index expires when the next survey opens or closes, and is removed by clear_cached_index_response when its data is changed.
+    """
+    payload = caches['long'].get(INDEX_RESPONSE_CACHE_KEY, version=1)
+    if payload is not None:
+        return payload
+
+    survey_list: list[Survey] = list(Survey.objects.all())
+    def generate_payload() -> dict:
+        jsonEncoder = json_encoder_factory()
+        body = json.dumps(get_index_survey_view_models(survey_list), cls=jsonEncoder).encode('utf-8')
+        return get_preserialized_json_payload(body)
+
+    return get_or_set_single_flight(caches['long'], INDEX_RESPONSE_CACHE_KEY, generate_payload, version=1, timeout=get_index_cache_timeout(survey_list))
+
+def get_index_cache_timeout(survey_list: list[Survey]) -> int:
+    """Gets for how long the index of the given surveys can be cached, which is until the next time one of them opens or closes."""
+    now = timezone.now()
+    next_boundaries = [
+        boundary
+        for survey in survey_list
+        for boundary in [survey.opening_time, survey.closing_time]
+        if boundary > now
+    ]
+    if not next_boundaries:
+        return INDEX_CACHE_MAX_TIMEOUT
+    # Round up, so that the index doesn't expire right before the survey's state changes
+    return min(INDEX_CACHE_MAX_TIMEOUT, math.ceil((min(next_boundaries) - now).total_seconds()))
+
 
-        resulttype_list = [ResultType.POPULARITY, ResultType.SCORE]
-        response = []
-        for survey in survey_list:
-            anime_results = None
-            anime_images = None
-            if survey.state == Survey.State.FINISHED:
-                anime_results = ResultsGenerator(survey).get_anime_results_data()
-                anime_results = {
-                    resulttype.value: get_top_results(anime_results, resulttype, 2)
-                    for resulttype in resulttype_list
-                }
-            else:
-                anime_list, _, _ = get_survey_anime(survey)
-                anime_images = Image.objects.filter(anime__in=anime_list).order_by('?')[:12]
-                anime_images = [ImageViewModel.from_model(image) for image in anime_images]
-
-            response.append(IndexSurveyViewModel.from_model(
-                model=survey,
-                anime_images=anime_images,
-                anime_results=anime_results,
-            ))
-
-        return JsonResponse(response, encoder=jsonEncoder, safe=False)
-
-
-def get_top_results(results: dict[int, dict[ResultType, float]], resulttype: ResultType, count: int, descending: bool=True):
+def get_index_survey_view_models(survey_list: list[Survey]) -> list[IndexSurveyViewModel]:
+    resulttype_list = [ResultType.POPULARITY, ResultType.SCORE]
+
+    # Collect the top results of all finished surveys and the images of all other surveys first, so that their data can be fetched at once
+    top_results_per_survey: dict[int, dict[ResultType, list[tuple[int, float]]]] = {}
+    image_ids_per_survey: dict[int, list[int]] = {}
+    for survey in survey_list:
+        if survey.state == Survey.State.FINISHED:
+            anime_results = ResultsGenerator(survey).get_anime_results_data()
+            top_results_per_survey[survey.id] = {
+                resulttype.value: get_top_results(anime_results, resulttype, 2)
+                for resulttype in resulttype_list
+            }
+        else:
+            # Sample the images from the survey's cached image ids, instead of sorting all of its images randomly in the database
+            survey_image_ids = get_survey_image_ids(survey)
+            image_ids_per_survey[survey.id] = random.sample(survey_image_ids, min(12, len(survey_image_ids)))
+
+    anime_data_dict = get_anime_view_models({
+        anime_id
+        for top_results_per_resulttype in top_results_per_survey.values()
+        for top_results in top_results_per_resulttype.values()
+        for (anime_id, _) in top_results
+    })
+    image_dict: dict[int, Image] = Image.objects.in_bulk([
+        image_id
+        for image_ids in image_ids_per_survey.values()
+        for image_id in image_ids
+    ])
+
+    response = []
+    for survey in survey_list:
+        anime_results = None
+        anime_images = None
+        if survey.id in top_results_per_survey:
+            anime_results = {
+                resulttype: [
+                    IndexSurveyAnimeViewModel(anime=anime_data_dict[anime_id], result=result)
+                    for (anime_id, result) in top_results
+                ] for resulttype, top_results in top_results_per_survey[survey.id].items()
+            }
+        else:
+            # Images may have been deleted since their ids were cached
+            anime_images = [ImageViewModel.from_model(image_dict[image_id]) for image_id in image_ids_per_survey[survey.id] if image_id in image_dict]
+
+        response.append(IndexSurveyViewModel.from_model(
+            model=survey,
+            anime_images=anime_images,
+            anime_results=anime_results,
+        ))
+    return response
+
+
+def export_index_snapshot() -> bool:
+    """Exports the index of all surveys to a static snapshot if all surveys are finished, returns whether it was exported.
+
+    The index of unfinished surveys changes when they open or close, so it's only exported once nothing can change it anymore.
+    """
+    survey_list: list[Survey] = list(Survey.objects.all())
+    if any(survey.state != Survey.State.FINISHED for survey in survey_list):
+        delete_snapshot(get_index_snapshot_path())
+        return False
+
+    write_snapshot(get_index_snapshot_path(), get_index_response_payload())
+    return True
+
+
+def get_top_results(results: dict[int, dict[ResultType, float]], resulttype: ResultType, count: int, descending: bool=True) -> list[tuple[int, float]]:
+    """Gets the ids and result values of the anime with the highest (or lowest) values of a result type, leaving out unpopular anime."""
     # Only keep anime above the popularity threshold, and with a valid result value
     sorted_results = [
-        (anime_id, anime_results)
+        (anime_id, anime_results[resulttype])
         for (anime_id, anime_results) in results.items()
         if anime_results[ResultType.POPULARITY] is not None
            and anime_results[ResultType.POPULARITY] > 0.02
@@ -65,13 +156,10 @@ def get_top_results(results: dict[int, dict[ResultType, float]], resulttype: Res
     sorted_results = sorted(
         sorted_results,
         reverse=descending,
-        key=lambda item: item[1][resulttype]
+        key=lambda item: item[1]
     )
 
-    return [                 # Check how this can be optimized
-        IndexSurveyAnimeViewModel(anime=AnimeViewModel.from_model(Anime.objects.get(id=anime_id)), result=anime_results[resulttype])
-        for (anime_id, anime_results) in sorted_results[:count]
-    ]
+    return sorted_results[:count]
 
 
 @dataclass
@@ -0,0 +1,97 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from django.http.request import HttpRequest
+from django.http.response import JsonResponse
+from django.views.generic import View
+from http import HTTPStatus
+from survey.models import Survey
+from survey.util.anime import get_anime_view_models
+from survey.util.data import ResultType, SurveyViewModel, ViewModelBase, json_encoder_factory
+from survey.util.http import HttpEmptyErrorResponse, JsonErrorResponse
+from survey.util.results import ResultsGenerator
+from survey.util.survey import try_get_survey
+from typing import Optional
+
+class SurveyComparisonApi(View):
+    def get(self, request: HttpRequest, *args, **kwargs):
+        preseason_survey = try_get_survey(year=self.kwargs['year'], season=self.kwargs['season'], pre_or_post='pre')
+        postseason_survey = try_get_survey(year=self.kwargs['year'], season=self.kwargs['season'], pre_or_post='post')
+        if preseason_survey is None or postseason_survey is None:
+            return HttpEmptyErrorResponse(HTTPStatus.NOT_FOUND)
+
+        if not request.user.is_staff:
+            for survey in [preseason_survey, postseason_survey]:
+                if survey.state == Survey.State.UPCOMING:
+                    return JsonErrorResponse('This survey is not open yet!', HTTPStatus.FORBIDDEN)
+                elif survey.state == Survey.State.ONGOING:
+                    return JsonErrorResponse('This survey is still ongoing!', HTTPStatus.FORBIDDEN)
+
+        comparison = get_results_comparison(
+            ResultsGenerator(preseason_survey).get_anime_results_data(),
+            ResultsGenerator(postseason_survey).get_anime_results_data(),
+        )
+
+        anime_data_dict = get_anime_view_models(comparison.keys())
+
+        json_encoder = json_encoder_factory()
+        return JsonResponse({
+            'comparison': comparison,
+            'anime': anime_data_dict,
+            'preseason_survey': SurveyViewModel.from_model(preseason_survey),
+            'postseason_survey': SurveyViewModel.from_model(postseason_survey),
+        }, encoder=json_encoder, safe=False)
+
+
+def get_results_comparison(preseason_results: dict[int, dict[ResultType, float]], postseason_results: dict[int, dict[ResultType, float]]) -> dict[int, AnimeComparisonViewModel]:
+    """Compares the expected score/popularity of every anime in the pre-season survey with its actual score/popularity in the post-season survey.
+
+    Only anime in both surveys are compared. Anime are ranked within each survey (1 being the highest), only taking into account anime that are in both surveys.
+    """
+    anime_ids = [anime_id for anime_id in preseason_results.keys() if anime_id in postseason_results]
+
+    def get_ranks(results: dict[int, dict[ResultType, float]], resulttype: ResultType) -> dict[int, int]:
+        ranked_anime_ids = sorted(
+            (anime_id for anime_id in anime_ids if results[anime_id][resulttype] is not None),
+            key=lambda anime_id: results[anime_id][resulttype],
+            reverse=True,
+        )
+        return {anime_id: idx + 1 for idx, anime_id in enumerate(ranked_anime_ids)}
+
+    def difference(a: Optional[float], b: Optional[float]) -> Optional[float]:
+        return a - b if a is not None and b is not None else None
+
+    rank_dicts = {
+        (is_preseason, resulttype): get_ranks(preseason_results if is_preseason else postseason_results, resulttype)
+        for is_preseason in [True, False] for resulttype in [ResultType.SCORE, ResultType.POPULARITY]
+    }
+
+    comparison = {}
+    for anime_id in anime_ids:
+        preseason_anime_results, postseason_anime_results = preseason_results[anime_id], postseason_results[anime_id]
+        comparison[anime_id] = AnimeComparisonViewModel(
+            preseason_score=preseason_anime_results[ResultType.SCORE],
+            postseason_score=postseason_anime_results[ResultType.SCORE],
+            score_difference=difference(postseason_anime_results[ResultType.SCORE], preseason_anime_results[ResultType.SCORE]),
+            preseason_score_rank=rank_dicts[(True, ResultType.SCORE)].get(anime_id),
+            postseason_score_rank=rank_dicts[(False, ResultType.SCORE)].get(anime_id),
+            preseason_popularity=preseason_anime_results[ResultType.POPULARITY],
+            postseason_popularity=postseason_anime_results[ResultType.POPULARITY],
+            popularity_difference=difference(postseason_anime_results[ResultType.POPULARITY], preseason_anime_results[ResultType.POPULARITY]),
+            preseason_popularity_rank=rank_dicts[(True, ResultType.POPULARITY)].get(anime_id),
+            postseason_popularity_rank=rank_dicts[(False, ResultType.POPULARITY)].get(anime_id),
+        )
+    return comparison
+
+
+@dataclass
+class AnimeComparisonViewModel(ViewModelBase):
+    preseason_score: Optional[float]
+    postseason_score: Optional[float]
+    score_difference: Optional[float]
+    preseason_score_rank: Optional[int]
+    postseason_score_rank: Optional[int]
+    preseason_popularity: Optional[float]
+    postseason_popularity: Optional[float]
+    popularity_difference: Optional[float]
+    preseason_popularity_rank: Optional[int]
+    postseason_popularity_rank: Optional[int]
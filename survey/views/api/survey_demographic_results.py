@@ -0,0 +1,42 @@
+from django.http.request import HttpRequest
+from django.http.response import JsonResponse
+from django.views.generic import View
+from http import HTTPStatus
+from survey.models import Response, Survey
+from survey.util.data import json_encoder_factory
+from survey.util.http import HttpEmptyErrorResponse, JsonErrorResponse
+from survey.util.results import AGE_BANDS, ResultsGenerator
+from survey.util.survey import try_get_survey
+
+class SurveyDemographicResultsApi(View):
+    def get(self, request: HttpRequest, *args, **kwargs):
+        survey = try_get_survey(
+            year=self.kwargs['year'],
+            season=self.kwargs['season'],
+            pre_or_post=self.kwargs['pre_or_post'],
+        )
+        if survey is None:
+            return HttpEmptyErrorResponse(HTTPStatus.NOT_FOUND)
+
+        if not request.user.is_staff:
+            if survey.state == Survey.State.UPCOMING:
+                return JsonErrorResponse('This survey is not open yet!', HTTPStatus.FORBIDDEN)
+            elif survey.state == Survey.State.ONGOING:
+                return JsonErrorResponse('This survey is still ongoing!', HTTPStatus.FORBIDDEN)
+
+        # No parameters means no filtering on that demographic
+        age_bands = request.GET.getlist('age') or None
+        genders = request.GET.getlist('gender') or None
+        if age_bands and any(age_band not in AGE_BANDS for age_band in age_bands):
+            return JsonErrorResponse('Unknown age band, valid age bands are: ' + ', '.join(AGE_BANDS.keys()), HTTPStatus.BAD_REQUEST)
+        if genders and any(gender not in Response.Gender.values for gender in genders):
+            return JsonErrorResponse('Unknown gender, valid genders are: ' + ', '.join(Response.Gender.values), HTTPStatus.BAD_REQUEST)
+
+        anime_results_data, response_count = ResultsGenerator(survey).get_demographic_anime_results_data(age_bands, genders)
+
+        json_encoder = json_encoder_factory()
+        return JsonResponse({
+            'results': anime_results_data,
+            'response_count': response_count,
+            'age_bands': list(AGE_BANDS.keys()),
+        }, encoder=json_encoder, safe=False)
@@ -2,8 +2,10 @@ from __future__ import annotations
 from dataclasses import dataclass
 from datetime import datetime
 from django.contrib.auth.models import User
+from django.core.cache import caches
 from django.core.exceptions import ValidationError
-from django.http import JsonResponse
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
 from django.http.request import HttpRequest
 from django.utils.decorators import method_decorator
 from django.utils.functional import classproperty
@@ -14,10 +16,12 @@ from http import HTTPStatus
 import json
 import logging
 from survey.models import AnimeResponse, MtmUserResponse, Response, Survey
-from survey.util.anime import anime_is_continuing
+from survey.util.anime import anime_is_continuing, get_anime_view_models
+from survey.util.cache import get_or_set_single_flight
+from survey.util.counters import ensure_counters, get_counter_values, update_counters
 from survey.util.data import AnimeViewModel, SurveyViewModel, json_encoder_factory, ViewModelBase
 from survey.util.http import HttpEmptyErrorResponse, JsonErrorResponse
-from survey.util.survey import try_get_survey, get_survey_anime
+from survey.util.survey import get_survey_cache_timeout, try_get_survey, get_survey_anime
 from typing import Any, Callable, Optional
 
 
@@ -49,27 +53,34 @@ class SurveyFormApi(View):
         if has_user_responded and previous_response is None:
             return JsonErrorResponse('You already responded to this survey!', HTTPStatus.FORBIDDEN)
 
-        anime_list, _, _ = get_survey_anime(survey)
+        catalogue = get_survey_form_catalogue(survey)
 
         response_data = ResponseViewModel.from_model(previous_response) if previous_response else ResponseViewModel()
+
+        # Load all of the previous anime responses at once, instead of querying them for each anime
+        previous_animeresponse_dict: dict[int, AnimeResponse] = {
+            animeresponse.anime_id: animeresponse
+            for animeresponse in AnimeResponse.objects.filter(response=previous_response)
+        } if previous_response else {}
+
         anime_response_data_dict: dict[int, AnimeResponseViewModel] = {}
-        for anime in anime_list:
-            previous_animeresponse_queryset = AnimeResponse.objects.filter(response=previous_response, anime=anime)
-            if previous_animeresponse_queryset and previous_animeresponse_queryset.count() == 1:
-                anime_response_data_dict[anime.id] = AnimeResponseViewModel.from_model(previous_animeresponse_queryset.first())
+        for anime_id in catalogue['anime_ids']:
+            if anime_id in previous_animeresponse_dict:
+                anime_response_data_dict[anime_id] = AnimeResponseViewModel.from_model(previous_animeresponse_dict[anime_id])
             else:
-                anime_response_data_dict[anime.id] = AnimeResponseViewModel()
-        
-        response = SurveyFormViewModel(
-            survey=SurveyViewModel.from_model(survey),
-            response_data=response_data,
-            anime_data_dict={anime.id: AnimeViewModel.from_model(anime) for anime in anime_list},
-            anime_response_data_dict=anime_response_data_dict,
-            is_anime_new_dict={anime.id: not anime_is_continuing(anime, survey) for anime in anime_list},
-            is_response_linked_to_user=response_was_linked,
+                anime_response_data_dict[anime_id] = AnimeResponseViewModel()
+
+        # Only the user's own data is serialized per request, the rest of the form is merged in from the catalogue's serialized fragments
+        user_data = {
+            'response_data': response_data,
+            'anime_response_data_dict': anime_response_data_dict,
+            'is_response_linked_to_user': response_was_linked,
+        }
+        body = '{%s}' % ', '.join(
+            '%s: %s' % (json.dumps(field), catalogue['fragments'][field] if field in catalogue['fragments'] else json.dumps(user_data[field], cls=jsonEncoder))
+            for field in SurveyFormViewModel.get_fields()
         )
-
-        return JsonResponse(response, encoder=jsonEncoder, safe=False)
+        return HttpResponse(body, content_type='application/json')
 
     def put(self, request: HttpRequest, *args, **kwargs):
         if not request.user.is_authenticated:
@@ -115,6 +126,15 @@ class SurveyFormApi(View):
 
         validation_errors = {}
 
+        # Keep track of what the previous response contributed to the live results counters before the models get updated
+        existing_anime_response_list: list[AnimeResponse] = list(AnimeResponse.objects.filter(response=previous_response)) if previous_response else []
+        previous_counter_values_dict = get_counter_values(
+            existing_anime_response_list,
+            previous_response.gender if previous_response else None,
+            previous_response.age if previous_response else None,
+            survey.is_preseason,
+        )
+
         response = response_data.to_model(previous_response)
         try:
             response.full_clean()
@@ -129,16 +149,16 @@ class SurveyFormApi(View):
         # Actual updating/inserting/deleting of AnimeResponse models
         #########################
 
-        existing_anime_response_queryset = AnimeResponse.objects.filter(response=previous_response)
-
-        anime_responses_to_update: dict[int, AnimeResponse] = { anime_response.anime_id: anime_response for anime_response in existing_anime_response_queryset.filter(anime_id__in=anime_response_data_dict.keys()) } if previous_response else {}
+        anime_responses_to_update: dict[int, AnimeResponse] = { anime_response.anime_id: anime_response for anime_response in existing_anime_response_list if anime_response.anime_id in anime_response_data_dict }
         anime_responses_to_add: list[AnimeResponse] = []
         for anime_id, anime_response_data in anime_response_data_dict.items():
             previous_anime_response = anime_responses_to_update.get(anime_id, None)
 
             anime_response = anime_response_data.to_model(previous_anime_response)
             try:
-                anime_response.full_clean()
+                # The anime are already checked to be in the survey, the response is the one validated above, and the data being keyed
+                # by anime id guarantees the unique constraint - validating these again would cost queries for every anime response
+                anime_response.full_clean(exclude=['response', 'anime'], validate_constraints=False)
             except ValidationError as e:
                 if 'anime_response_data_dict' not in validation_errors:
                     validation_errors['anime_response_data_dict'] = {}
@@ -151,13 +171,25 @@ class SurveyFormApi(View):
         if validation_errors:
             return JsonErrorResponse({'validation': validation_errors}, HTTPStatus.BAD_REQUEST)
 
-        response.save()
-        for anime_response in anime_responses_to_add:
-            anime_response.response = response
-        AnimeResponse.objects.bulk_create(anime_responses_to_add)
-        AnimeResponse.objects.bulk_update(anime_responses_to_update.values(), ['watching', 'underwatched', 'score', 'expectations'])
-        if previous_response:
-            existing_anime_response_queryset.exclude(anime_id__in=anime_response_data_dict.keys()).delete()
+        # The counters have to contain all other responses before this response's changes are applied to them
+        ensure_counters(survey)
+
+        with transaction.atomic():
+            response.save()
+            for anime_response in anime_responses_to_add:
+                anime_response.response = response
+            AnimeResponse.objects.bulk_create(anime_responses_to_add)
+            AnimeResponse.objects.bulk_update(anime_responses_to_update.values(), ['watching', 'underwatched', 'score', 'expectations'])
+            if previous_response:
+                AnimeResponse.objects.filter(response=previous_response).exclude(anime_id__in=anime_response_data_dict.keys()).delete()
+
+            counter_values_dict = get_counter_values(
+                anime_responses_to_add + list(anime_responses_to_update.values()),
+                response.gender,
+                response.age,
+                survey.is_preseason,
+            )
+            update_counters(survey, previous_counter_values_dict, counter_values_dict)
 
         #########################
         #########################
@@ -197,6 +229,33 @@ def try_get_previous_response(user: User, response_public_id: Optional[str], sur
 
         return response, response_was_linked, True
 
+def get_survey_form_catalogue(survey: Survey) -> dict[str, Any]:
+    """Gets the part of the survey form that is the same for every user from the cache, or generates it.
+
+    The cached catalogue is cleared by the signal receivers in survey.signals when the survey, anime, their names or their images change.
+
+    Returns
+    -------
+    dict
+        A dict with keys 'anime_ids' ([anime_id], in the order of the survey's anime) and 'fragments'
+        ({field: str}, containing the serialized survey, anime_data_dict and is_anime_new_dict fields of SurveyFormViewModel).
+    """
+    def generate_catalogue() -> dict[str, Any]:
+        anime_list = list(get_survey_anime(survey)[0])
+        jsonEncoder = json_encoder_factory()
+        fragments = {
+            'survey': SurveyViewModel.from_model(survey),
+            'anime_data_dict': get_anime_view_models(anime.id for anime in anime_list),
+            'is_anime_new_dict': {anime.id: not anime_is_continuing(anime, survey) for anime in anime_list},
+        }
+        return {
+            'anime_ids': [anime.id for anime in anime_list],
+            'fragments': {field: json.dumps(value, cls=jsonEncoder) for field, value in fragments.items()},
+        }
+
+    return get_or_set_single_flight(caches['long'], 'survey_form_catalogue_%i' % survey.id, generate_catalogue, version=1, timeout=get_survey_cache_timeout(survey))
+
+
 def get_username_hash(user: User) -> bytes:
     return sha512(user.username.encode('utf-8')).digest()
 
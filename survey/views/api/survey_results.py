@@ -1,18 +1,40 @@
-from collections import OrderedDict
-from django.db.models import Q
-from django.db.models.query import QuerySet
-from django.http.request import HttpRequest
+from __future__ import annotations
+from dataclasses import dataclass
+from django.core.cache import caches
+from django.http.request import HttpRequest, QueryDict
 from django.http.response import JsonResponse
 from django.views.generic import View
 from http import HTTPStatus
-from survey.models import Response, Survey
-from survey.util.data import AnimeViewModel, SurveyViewModel, json_encoder_factory
-from survey.util.http import HttpEmptyErrorResponse, JsonErrorResponse
-from survey.util.results import ResultsGenerator
-from survey.util.survey import get_survey_anime, try_get_survey
+from itertools import islice
+import json
+from survey.models import Survey
+from survey.util.anime import get_anime_view_models
+from survey.util.cache import get_or_set_single_flight
+from survey.util.data import AnimeViewModel, ResultType, SurveyViewModel, json_encoder_factory
+from survey.util.http import HttpEmptyErrorResponse, JsonErrorResponse, get_preserialized_json_payload, get_preserialized_json_response
+from survey.util.results import RESULTS_RESPONSE_FORMATS, ResultsGenerator, get_results_response_cache_key
+from survey.util.snapshots import get_results_snapshot_path, write_snapshot
+from survey.util.survey import get_survey_anime, get_survey_cache_timeout, try_get_survey
+from typing import Optional
 
 class SurveyResultsApi(View):
     def get(self, request: HttpRequest, *args, **kwargs):
+        response_format = request.GET.get('format', 'default')
+        if response_format not in RESULTS_RESPONSE_FORMATS:
+            return JsonErrorResponse('Unknown format!', HTTPStatus.BAD_REQUEST)
+
+        try:
+            selection = ResultsSelection.from_query_dict(request.GET)
+        except ValueError as e:
+            return JsonErrorResponse(str(e), HTTPStatus.BAD_REQUEST)
+
+        # Responses of finished surveys never change, so they're cached fully serialized and returned without touching the database
+        if selection is None and self.kwargs['pre_or_post'] in ['pre', 'post']:
+            cache_key = get_results_response_cache_key(self.kwargs['year'], self.kwargs['season'], self.kwargs['pre_or_post'] == 'pre', response_format)
+            cached_response = caches['long'].get(cache_key, version=2)
+            if cached_response is not None:
+                return get_preserialized_json_response(request, cached_response)
+
         survey = try_get_survey(
             year=self.kwargs['year'],
             season=self.kwargs['season'],
@@ -27,54 +49,206 @@ class SurveyResultsApi(View):
             elif survey.state == Survey.State.ONGOING:
                 return JsonErrorResponse('This survey is still ongoing!', HTTPStatus.FORBIDDEN)
 
-        # TODO: Optimize, this (and age/gender distr. stuff) prob do multiple DB lookups
-        survey_results = ResultsGenerator(survey).get_anime_results_data()
-        survey_responses = Response.objects.filter(survey=survey)
+        if selection is None and survey.state == Survey.State.FINISHED:
+            return get_preserialized_json_response(request, get_results_response_payload(survey, response_format))
 
-        survey_anime_queryset, _, _ = get_survey_anime(survey)
-        survey_anime_data_list = {anime.id: AnimeViewModel.from_model(anime) for anime in survey_anime_queryset}
-        survey_data = SurveyViewModel.from_model(survey)
+        json_encoder = json_encoder_factory()
+        return JsonResponse(get_results_response_data(survey, response_format, selection), encoder=json_encoder, safe=False)
 
+
+def get_results_response_payload(survey: Survey, response_format: str) -> dict:
+    """Gets the serialized results response of a finished survey (see get_preserialized_json_payload) from the cache, or generates it."""
+    def generate_payload() -> dict:
         json_encoder = json_encoder_factory()
-        return JsonResponse({
-            'results': survey_results,
-            'anime': survey_anime_data_list,
-            'survey': survey_data,
-            'miscellaneous': {
-                'response_count': survey_responses.count(),
-                'gender_distribution': self.__get_gender_distribution(survey_responses),
-                'age_distribution': self.__get_age_distribution(survey_responses),
-            },
-        }, encoder=json_encoder, safe=False)
-
-    def __get_gender_distribution(self, survey_responses: QuerySet[Response]):
-        gender_answers_queryset = survey_responses.filter(~Q(gender=''), gender__isnull=False)
-        gender_answers_count = len(gender_answers_queryset)
-        gender_distribution = OrderedDict([
-            (Response.Gender.MALE,   gender_answers_queryset.filter(gender=Response.Gender.MALE  ).count() / max(gender_answers_count, 1) * 100),
-            (Response.Gender.FEMALE, gender_answers_queryset.filter(gender=Response.Gender.FEMALE).count() / max(gender_answers_count, 1) * 100),
-            (Response.Gender.OTHER,  gender_answers_queryset.filter(gender=Response.Gender.OTHER ).count() / max(gender_answers_count, 1) * 100),
-        ])
-
-        return gender_distribution
-
-    def __get_age_distribution(self, survey_responses: QuerySet[Response]):
-        age_distribution = [0]*81
-        age_list = survey_responses.filter(age__isnull=False, age__gt=0).values_list('age', flat=True)
-        age_count = len(age_list)
-
-        # Count for each age how many people are that old.
-        for age in age_list:
-            if age > 0 and age <= 80:
-                age_distribution[int(age)] += 1
-
-        # Normalize the values to 0-100.
-        for i in range(len(age_distribution)):
-            age_distribution[i] /= max(age_count, 1) / 100.0
-
-        # Convert the list to a dict.
-        age_distribution = OrderedDict([
-            (idx, age_distribution[idx]) for idx in range(5, 81)
-        ])
-
-        return age_distribution
+        body = json.dumps(get_results_response_data(survey, response_format), cls=json_encoder).encode('utf-8')
+        return get_preserialized_json_payload(body)
+
+    return get_or_set_single_flight(
+        caches['long'],
+        get_results_response_cache_key(survey.year, survey.season, survey.is_preseason, response_format),
+        generate_payload,
+        version=2,
+        timeout=get_survey_cache_timeout(survey),
+    )
+
+def export_results_snapshots(survey: Survey, overwrite: bool = True) -> bool:
+    """Exports the results responses of a finished survey in all formats to static snapshots.
+
+    Returns False if overwrite is False and all snapshots already exist, in which case nothing is exported.
+    """
+    snapshot_paths = {
+        response_format: get_results_snapshot_path(survey.year, survey.season, survey.is_preseason, response_format)
+        for response_format in RESULTS_RESPONSE_FORMATS
+    }
+    if not overwrite and all(path.exists() for path in snapshot_paths.values()):
+        return False
+
+    for response_format, snapshot_path in snapshot_paths.items():
+        payload = get_results_response_payload(survey, response_format)
+        write_snapshot(snapshot_path, payload)
+    return True
+
+def get_results_response_data(survey: Survey, response_format: str, selection: Optional[ResultsSelection] = None) -> dict:
+    results_generator = ResultsGenerator(survey)
+    survey_results = results_generator.get_anime_results_data()
+
+    rankings = None
+    if selection is None:
+        survey_anime_queryset, _, _ = get_survey_anime(survey)
+        survey_anime_data_list = get_anime_view_models(survey_anime_queryset)
+    else:
+        # Only the anime in the selected results are included in the catalogue
+        survey_results, rankings = selection.select(survey_results, results_generator.get_result_rankings(survey_results))
+        survey_anime_data_list = get_anime_view_models(survey_results.keys())
+    survey_data = SurveyViewModel.from_model(survey)
+
+    response_data = {
+        'results': survey_results,
+        'anime': survey_anime_data_list,
+        'survey': survey_data,
+        'miscellaneous': results_generator.get_response_distributions(),
+    }
+    if rankings is not None:
+        response_data['rankings'] = rankings
+    if response_format == 'columnar':
+        response_data.update(get_columnar_results(survey_results, survey_anime_data_list))
+    return response_data
+
+
+@dataclass
+class ResultsSelection:
+    """Selection of a subset of the results, parsed from the query parameters of SurveyResultsApi.
+
+    Query parameters
+    ----------------
+    result_types : comma-separated ResultType values
+        Only include these result types, defaults to all result types.
+    top, bottom : int
+        Only include the anime with the highest/lowest values of each selected result type, and add their ids to the response's 'rankings'.
+    anime_group : 'series' or 'special'
+        Only include anime series or special anime.
+    min_popularity : float
+        Only rank anime with a higher popularity than this, defaults to 0.02 like the index's top results.
+    """
+    result_types: Optional[list[ResultType]] = None
+    top: Optional[int] = None
+    bottom: Optional[int] = None
+    anime_group: Optional[str] = None
+    min_popularity: float = 0.02
+
+    QUERY_PARAMETERS = ['result_types', 'top', 'bottom', 'anime_group', 'min_popularity']
+
+    @staticmethod
+    def from_query_dict(query_dict: QueryDict) -> Optional[ResultsSelection]:
+        """Parses the selection from query parameters, returns None if none of the parameters are given. Raises a ValueError if a parameter is invalid."""
+        if not any(parameter in query_dict for parameter in ResultsSelection.QUERY_PARAMETERS):
+            return None
+
+        def parse_count(parameter: str) -> Optional[int]:
+            if parameter not in query_dict:
+                return None
+            try:
+                count = int(query_dict[parameter])
+            except ValueError:
+                count = -1
+            if count < 0:
+                raise ValueError('%s has to be a non-negative integer!' % parameter)
+            return count
+
+        selection = ResultsSelection(top=parse_count('top'), bottom=parse_count('bottom'))
+
+        if 'result_types' in query_dict:
+            try:
+                selection.result_types = [ResultType(int(resulttype)) for resulttype in query_dict['result_types'].split(',')]
+            except ValueError:
+                raise ValueError('result_types has to be a comma-separated list of result types!')
+
+        if 'anime_group' in query_dict:
+            selection.anime_group = query_dict['anime_group']
+            if selection.anime_group not in ['series', 'special']:
+                raise ValueError('anime_group has to be either series or special!')
+
+        if 'min_popularity' in query_dict:
+            try:
+                selection.min_popularity = float(query_dict['min_popularity'])
+            except ValueError:
+                raise ValueError('min_popularity has to be a number!')
+
+        return selection
+
+    def select(self, results: dict[int, dict[ResultType, float]], result_rankings: dict) -> tuple[dict[int, dict[ResultType, float]], Optional[dict[ResultType, dict[str, list[int]]]]]:
+        """Selects the results using the rankings of ResultsGenerator.get_result_rankings, without sorting the results again.
+
+        Returns
+        -------
+        ({anime_id: {ResultType: float}}, {ResultType: {'top': [anime_id], 'bottom': [anime_id]}})
+            The selected results, and the ids of the top and bottom anime of each selected result type (None if neither top nor bottom was given).
+        """
+        rankings: dict[ResultType, list[int]] = result_rankings['rankings']
+        series_anime_ids: set[int] = result_rankings['series_anime_ids']
+        resulttype_list = self.result_types if self.result_types is not None else list(rankings.keys())
+
+        def is_in_group(anime_id: int) -> bool:
+            return self.anime_group is None or (anime_id in series_anime_ids) == (self.anime_group == 'series')
+
+        def is_rankable(anime_id: int) -> bool:
+            popularity = results[anime_id].get(ResultType.POPULARITY)
+            return is_in_group(anime_id) and popularity is not None and popularity > self.min_popularity
+
+        selected_rankings = None
+        if self.top is None and self.bottom is None:
+            selected_anime_ids = {anime_id for anime_id in results.keys() if is_in_group(anime_id)}
+        else:
+            selected_rankings = {}
+            for resulttype in resulttype_list:
+                ranking = rankings.get(resulttype, [])
+                selected_rankings[resulttype] = {
+                    'top': list(islice((anime_id for anime_id in ranking if is_rankable(anime_id)), self.top or 0)),
+                    'bottom': list(islice((anime_id for anime_id in reversed(ranking) if is_rankable(anime_id)), self.bottom or 0)),
+                }
+            selected_anime_ids = {anime_id for ranking in selected_rankings.values() for anime_ids in ranking.values() for anime_id in anime_ids}
+
+        selected_results = {
+            anime_id: {resulttype: anime_results.get(resulttype) for resulttype in resulttype_list}
+            for anime_id, anime_results in results.items() if anime_id in selected_anime_ids
+        }
+        return selected_results, selected_rankings
+
+
+def get_columnar_results(results: dict[int, dict[ResultType, float]], anime_data_dict: dict[int, AnimeViewModel]) -> dict:
+    """Converts results and anime data into a compact format, where each result type and anime field is a list aligned to a single list of anime ids.
+
+    Result values are rounded to 5 significant digits, and names and images are lists of values instead of objects.
+
+    Returns
+    -------
+    dict
+        A dict with keys 'anime_ids' ([int]), 'results' ({ResultType: [float]}) and 'anime' ({field: list}).
+    """
+    anime_ids = [anime_id for anime_id in results.keys() if anime_id in anime_data_dict]
+
+    resulttype_list: list[ResultType] = []
+    for anime_results in results.values():
+        resulttype_list += [resulttype for resulttype in anime_results.keys() if resulttype not in resulttype_list]
+
+    def round_result(value: Optional[float]) -> Optional[float]:
+        return float('%.5g' % value) if value is not None else None
+
+    return {
+        'anime_ids': anime_ids,
+        'results': {
+            resulttype: [round_result(results[anime_id].get(resulttype)) for anime_id in anime_ids]
+            for resulttype in resulttype_list
+        },
+        'anime': {
+            'anime_types': [anime_data_dict[anime_id].anime_type for anime_id in anime_ids],
+            'names': [
+                [[name.name, name.is_official, name.type] for name in anime_data_dict[anime_id].names]
+                for anime_id in anime_ids
+            ],
+            'images': [
+                [[image.name, image.url_small, image.url_medium, image.url_large] for image in anime_data_dict[anime_id].images]
+                for anime_id in anime_ids
+            ],
+        },
+    }
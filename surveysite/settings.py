@@ -67,6 +67,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'survey.middleware.ServerTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.cache.UpdateCacheMiddleware',
     'htmlmin.middleware.HtmlMinifyMiddleware',
@@ -84,6 +85,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.cache.FetchFromCacheMiddleware',
     'htmlmin.middleware.MarkRequestMiddleware',
+    'survey.middleware.CacheGenerationTimeoutMiddleware',
 ]
 
 ROOT_URLCONF = 'surveysite.urls'
@@ -158,10 +160,22 @@ CACHES = {
     },
 }
 
+# Lock files ensuring that only one process generates an uncached value at a time
+CACHE_LOCK_DIR = BASE_DIR / 'cache/locks/'
+
 CACHE_MIDDLEWARE_ALIAS = 'default'
 CACHE_MIDDLEWARE_SECONDS = 600
 CACHE_MIDDLEWARE_KEY_PREFIX = ''
 
+# Backend used to aggregate survey responses into results, either 'database' or 'numpy'
+RESULTS_BACKEND = os.environ.get('WEBSITE_RESULTS_BACKEND', 'database')
+
+# Whether to add bootstrapped confidence intervals of popularity and score to survey results (requires NumPy)
+RESULTS_CONFIDENCE_INTERVALS = True if os.environ.get('WEBSITE_RESULTS_CONFIDENCE_INTERVALS') else False
+
+# Whether to add a Server-Timing header to API responses and log their timings to the timing log file
+SERVER_TIMING = True if os.environ.get('WEBSITE_SERVER_TIMING') else False
+
 # Logging
 # https://docs.djangoproject.com/en/3.1/topics/logging/
 
@@ -170,6 +184,7 @@ CACHE_MIDDLEWARE_KEY_PREFIX = ''
 
 log_directory = 'log/'
 log_filename = datetime.datetime.now().strftime('%Y%m%d') + '.log'
+timing_log_filename = datetime.datetime.now().strftime('%Y%m%d') + '-timing.log'
 try:
     os.mkdir(BASE_DIR / log_directory)
 except FileExistsError:
@@ -188,6 +203,10 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'timing': {
+            'format': '{asctime} {message}',
+            'style': '{',
+        },
     },
     'filters': {
         'require_debug_false': {
@@ -210,6 +229,14 @@ LOGGING = {
             'filename': BASE_DIR / (log_directory + log_filename),
             'formatter': 'file',
         },
+        'timing_file': {
+            'level': 'INFO',
+            'class': 'logging.FileHandler',
+            'filename': BASE_DIR / (log_directory + timing_log_filename),
+            'formatter': 'timing',
+            # Only create the file once something is logged, i.e. when SERVER_TIMING is enabled
+            'delay': True,
+        },
     },
     'root': {
         'handlers': ['file'],
@@ -218,6 +245,11 @@ LOGGING = {
         'django': {
             'handlers': ['console'],
         },
+        'survey.timing': {
+            'handlers': ['timing_file'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 